@@ -1,54 +1,1792 @@
+import time
+
+# Début du chargement du module (rapport de démarrage)
+_MODULE_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+import numpy as np
 import pandas as pd
 import pickle
 from typing import List
-import matplotlib.pyplot as plt
+import argparse
+import codecs
+import copy
+import glob
+import hashlib
+import io
 import json
+import os
+import queue
+import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+DICTBANK = {
+    "BNP": {
+        "date": "Date operation",
+        "name": "Libelle operation",
+        "amount": "Montant operation en euro",
+    },
+    "BNP2": {
+        "date": "Date operation",
+        "name": "Libelle operation",
+        "amount": "Montant operation",
+    },
+    "BoursoBank": {"date": "dateOp", "name": "label", "amount": "amount"},
+}
+
+
+OPERATION_COLUMNS = ["id", "date", "name", "account", "amount", "category", "Mensuel"]
+
+
+def _json_default(value):
+    """
+    Converts numpy / pandas scalars so that json.dump can write them.
+    """
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _balance_to_records(account_balance):
+    """
+    Converts an account balance history to a list of {"date", "balance"} records.
+    Handles the legacy layout where each column is a date holding the balance.
+    """
+    if account_balance is None or account_balance.empty:
+        return []
+    if "date" in account_balance and "balance" in account_balance:
+        dates = pd.to_datetime(account_balance["date"], errors="coerce")
+        balances = account_balance["balance"]
+    else:
+        dates = pd.to_datetime(pd.Series(account_balance.columns), errors="coerce")
+        balances = account_balance.iloc[0]
+    return [
+        {"date": None if pd.isna(date) else date.isoformat(), "balance": balance}
+        for date, balance in zip(dates, balances)
+    ]
+
+
+def _records_to_balance(records):
+    """
+    Rebuilds an account balance DataFrame from its records.
+    """
+    balance = pd.DataFrame(records, columns=["date", "balance"])
+    balance["date"] = pd.to_datetime(balance["date"])
+    return balance
+
+
+def _atomic_write(path, write):
+    """
+    Writes a file through a temporary file, fsynced then renamed over the target,
+    so that a crash never leaves a truncated file behind.
+    """
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    with open(tmp_path, "rb+") as file:
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _rows_to_records(rows):
+    """
+    Converts operation rows to JSON-friendly records.
+    """
+    return [
+        {col: (None if pd.isna(value) else value) for col, value in record.items()}
+        for record in rows[OPERATION_COLUMNS].to_dict("records")
+    ]
+
+
+def _records_to_rows(records):
+    """
+    Rebuilds operation rows from records written by _rows_to_records.
+    """
+    rows = pd.DataFrame(records, columns=OPERATION_COLUMNS)
+    rows["date"] = pd.to_datetime(rows["date"])
+    return rows
+
+
+def _normalize_operations(operations):
+    """
+    Returns a copy of the operations with stable dtypes, suitable for columnar storage.
+    """
+    normalized = operations.copy()
+    normalized["id"] = normalized["id"].astype("int64")
+    normalized["date"] = pd.to_datetime(normalized["date"], errors="coerce")
+    normalized["amount"] = pd.to_numeric(normalized["amount"], errors="coerce")
+    normalized["Mensuel"] = normalized["Mensuel"].fillna(False).astype(bool)
+    for col in ["name", "account", "category"]:
+        normalized[col] = normalized[col].astype(str)
+    return normalized
+
+
+class ColumnarStore:
+    """
+    Stockage en colonnes des données budgétaires.
+    Les opérations sont écrites en Parquet, un fichier par année, et les comptes,
+    catégories et règles dans un petit fichier metadata.json :
+
+        budget_data/
+            metadata.json
+            classifier.2.json
+            operations/2023.1.parquet
+            operations/2024.3.parquet
+
+    Seules les années dont le contenu a changé sont réécrites, sous un nouveau
+    nom (numéro de sauvegarde), comme le classifieur de libellés, gardé hors de
+    metadata.json pour que ce fichier reste petit : metadata.json, remplacé atomiquement en
+    dernier, désigne toujours des partitions cohérentes avec son journal_seq,
+    et les anciens fichiers ne sont supprimés qu'ensuite.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, path):
+        self.path = path
+        self.metadata_path = os.path.join(path, "metadata.json")
+        self.operations_dir = os.path.join(path, "operations")
+
+    @staticmethod
+    def is_available():
+        """
+        Returns True if a Parquet engine (pyarrow) is installed.
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def is_store(path):
+        """
+        Returns True if the path is a columnar store directory.
+        """
+        return os.path.isfile(os.path.join(path, "metadata.json"))
+
+    def _require_engine(self):
+        if not self.is_available():
+            raise ImportError(
+                "The columnar storage backend requires pyarrow (pip install pyarrow)."
+            )
+
+    def _read_metadata(self):
+        try:
+            with open(self.metadata_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, manager):
+        """
+        Saves the manager: one Parquet file per year plus the metadata file.
+        """
+        self._require_engine()
+        os.makedirs(self.operations_dir, exist_ok=True)
+        old_metadata = self._read_metadata()
+        old_partitions = self._partitions(old_metadata)
+        generation = old_metadata.get("generation", 0) + 1
+
+        operations = _normalize_operations(manager.operations)
+        years = operations["date"].dt.year.fillna(0).astype(int)
+        partitions = {}
+        for year, part in operations.groupby(years, sort=True):
+            key = str(year) if year else "undated"
+            digest = str(pd.util.hash_pandas_object(part, index=True).sum())
+            old = old_partitions.get(key)
+            if (
+                old is not None
+                and old["digest"] == digest
+                and os.path.exists(os.path.join(self.operations_dir, old["file"]))
+            ):
+                partitions[key] = old
+                continue
+            partitions[key] = {"digest": digest, "file": f"{key}.{generation}.parquet"}
+            part_path = os.path.join(self.operations_dir, partitions[key]["file"])
+            _atomic_write(part_path, lambda p, part=part: part.to_parquet(p))
+
+        # Le classifieur n'est réécrit que s'il a appris depuis la sauvegarde
+        classifier = manager.classifier
+        classifier_file = old_metadata.get("classifier_file")
+        if classifier is None:
+            classifier_file = None
+        elif (
+            manager._saved_classifier != (classifier, classifier.changes)
+            or classifier_file is None
+            or not os.path.exists(os.path.join(self.path, classifier_file))
+        ):
+            classifier_file = f"classifier.{generation}.json"
+
+            def write_classifier(path):
+                with open(path, "w", encoding="utf-8") as file:
+                    json.dump(classifier.to_dict(), file, ensure_ascii=False)
+
+            _atomic_write(os.path.join(self.path, classifier_file), write_classifier)
+
+        metadata = {
+            "format_version": self.FORMAT_VERSION,
+            "categories": manager.categories,
+            "accounts": {
+                name: {
+                    "account_num": details["account_num"],
+                    "account_balance": _balance_to_records(details["account_balance"]),
+                }
+                for name, details in manager.accounts.items()
+            },
+            "rules_file": manager.rules_file,
+            "categorization_rules": manager.categorization_rules,
+            "generation": generation,
+            "partitions": partitions,
+            "journal_seq": manager.journal_seq,
+            "next_id": manager._next_id,
+            "import_ledger": manager.import_ledger,
+            "classifier_file": classifier_file,
+        }
+
+        def write_metadata(path):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(
+                    metadata, file, ensure_ascii=False, indent=4, default=_json_default
+                )
+
+        _atomic_write(self.metadata_path, write_metadata)
+
+        # Fichiers remplacés, ou laissés par une sauvegarde interrompue
+        used = {partition["file"] for partition in partitions.values()}
+        for name in os.listdir(self.operations_dir):
+            if name not in used:
+                os.remove(os.path.join(self.operations_dir, name))
+        for name in glob.glob(os.path.join(glob.escape(self.path), "classifier.*.json")):
+            if os.path.basename(name) != classifier_file:
+                os.remove(name)
+        manager._saved_classifier = (
+            (classifier, classifier.changes) if classifier is not None else None
+        )
+
+    def read_classifier(self, manager):
+        """
+        Loads the saved label classifier into the manager (format 1 stores kept
+        it in metadata.json).
+        """
+        metadata = self._read_metadata()
+        if metadata.get("classifier_file"):
+            path = os.path.join(self.path, metadata["classifier_file"])
+            with open(path, "r", encoding="utf-8") as file:
+                manager.classifier = LabelClassifier.from_dict(json.load(file))
+        elif metadata.get("classifier") is not None:
+            manager.classifier = LabelClassifier.from_dict(metadata["classifier"])
+        else:
+            return
+        manager._saved_classifier = (manager.classifier, manager.classifier.changes)
+
+    @staticmethod
+    def _partitions(metadata):
+        """
+        Returns {key: {"digest", "file"}} from the metadata (format 1 stored
+        the digest only, in "<key>.parquet").
+        """
+        return {
+            key: (
+                value
+                if isinstance(value, dict)
+                else {"digest": value, "file": f"{key}.parquet"}
+            )
+            for key, value in metadata.get("partitions", {}).items()
+        }
+
+    def partition_keys(self):
+        """
+        Returns the keys of the saved partitions (years, and "undated").
+        """
+        return list(self._read_metadata().get("partitions", {}))
+
+    def read_partitions(self, keys):
+        """
+        Reads the operations of the given partitions (nothing is modified, so
+        it can run in a worker thread).
+        """
+        partitions = self._partitions(self._read_metadata())
+        return [
+            pd.read_parquet(os.path.join(self.operations_dir, partitions[key]["file"]))
+            for key in keys
+        ]
+
+    def load(self, manager, partitions=None):
+        """
+        Loads the store content into the given manager: all the operations, or
+        only those of the given partitions.
+        """
+        self._require_engine()
+        metadata = self._read_metadata()
+        if not metadata:
+            raise FileNotFoundError(f"No columnar store found in '{self.path}'.")
+        if metadata.get("format_version", 0) > self.FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported storage format version {metadata['format_version']}."
+            )
+
+        manager.categories = metadata["categories"]
+        manager.rules_file = metadata.get("rules_file", manager.rules_file)
+        manager.categorization_rules = metadata.get(
+            "categorization_rules", manager.categorization_rules
+        )
+        manager.accounts = {
+            name: {
+                "account_num": details["account_num"],
+                "account_balance": _records_to_balance(details["account_balance"]),
+            }
+            for name, details in metadata["accounts"].items()
+        }
+        manager.journal_seq = metadata.get("journal_seq", 0)
+        manager.import_ledger = metadata.get("import_ledger", {})
+
+        if partitions is None:
+            # En chargement partiel, le classifieur est lu par finish_loading
+            self.read_classifier(manager)
+            partitions = metadata.get("partitions", {})
+        parts = self.read_partitions(partitions)
+        if parts:
+            # Les stockages antérieurs aux identifiants n'ont pas de colonne id
+            manager.operations = (
+                pd.concat(parts).sort_index().reindex(columns=OPERATION_COLUMNS)
+            )
+        manager._next_id = metadata.get("next_id", 0)
+        manager._ensure_ids()
+        return manager
+
+
+def _journal_size(entries):
+    """
+    Size of journal entries in operations: an entry carrying rows (add, import)
+    or ids (categorize) counts one per row, the others count one.
+    """
+    return sum(
+        max(len(entry.get("rows", ())), len(entry.get("ids", ())), 1)
+        for entry in entries
+    )
+
+
+class OperationJournal:
+    """
+    Journal append-only (write-ahead log) des modifications du budget.
+    Chaque ligne est une entrée JSON numérotée (seq). Au chargement, les entrées
+    plus récentes que la dernière sauvegarde complète (snapshot) sont rejouées.
+
+    Politiques de fsync :
+        "always" : chaque modification est écrite et synchronisée immédiatement
+        "save"   : les modifications sont écrites et synchronisées à la sauvegarde
+        "never"  : écrites à la sauvegarde, synchronisation laissée au système
+    """
+
+    FSYNC_POLICIES = ("always", "save", "never")
+
+    def __init__(self, path, fsync="save"):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy '{fsync}'.")
+        self.path = path
+        self.fsync = fsync
+
+    def append(self, entries):
+        """
+        Appends entries at the end of the journal.
+        """
+        if not entries:
+            return
+        with open(self.path, "a", encoding="utf-8") as file:
+            for entry in entries:
+                file.write(
+                    json.dumps(entry, ensure_ascii=False, default=_json_default) + "\n"
+                )
+            file.flush()
+            if self.fsync != "never":
+                os.fsync(file.fileno())
+
+    def read(self, after_seq=0):
+        """
+        Returns the entries whose seq is greater than after_seq.
+        A torn last line (crash during a write) is ignored.
+        """
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if entry["seq"] > after_seq:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def truncate(self):
+        """
+        Empties the journal once its entries are part of a snapshot.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def period_bounds(year=None, month=None):
+    """
+    Returns the [start, end) dates covering a year, or a month of that year.
+    Returns (None, None) when no year is given.
+    """
+    if year is None:
+        return None, None
+    if month is None:
+        start = pd.Timestamp(year=int(year), month=1, day=1)
+        return start, start + pd.DateOffset(years=1)
+    start = pd.Timestamp(year=int(year), month=int(month), day=1)
+    return start, start + pd.DateOffset(months=1)
+
+
+def year_month(dates):
+    """
+    Returns the year * 100 + month integer key of dates (0 for missing dates).
+    """
+    dates = pd.to_datetime(pd.Series(dates))
+    return (dates.dt.year * 100 + dates.dt.month).fillna(0).astype("int64")
+
+
+def _month_range(start, end):
+    """
+    Returns the year-month keys of the whole months covering [start, end),
+    or None when a bound does not fall on the first day of a month.
+    """
+    for bound in (start, end):
+        if bound is not None and (bound.day != 1 or bound != bound.normalize()):
+            return None
+    months = pd.period_range(start, end - pd.DateOffset(days=1), freq="M")
+    return [period.year * 100 + period.month for period in months]
+
+
+class OperationCube:
+    """
+    Cube des opérations tenu à jour à chaque modification : une cellule par
+    (compte, catégorie, année-mois) avec la somme et le nombre d'opérations.
+    Des cumuls par catégorie (réel et virtuel), par compte et par mois servent
+    le résumé sans parcourir les cellules ; les cellules servent les sommes
+    d'un compte sur une période. Les montants
+    sont cumulés en centimes entiers, pour que les ajouts et retraits
+    successifs ne dérivent pas.
+    """
+
+    def __init__(self, operations=None):
+        # (compte, catégorie, année * 100 + mois) -> [centimes, nombre]
+        self.cells = {}
+        self.totals = {}  # (catégorie, virtuel) -> centimes
+        self.accounts = {}  # compte -> {catégorie: centimes}
+        self.months = {}  # année * 100 + mois -> {(catégorie, virtuel): centimes}
+        self.month_counts = {}  # année * 100 + mois -> nombre d'opérations
+        if operations is not None:
+            self.add(operations)
+
+    @staticmethod
+    def _bump(table, key, value):
+        value += table.get(key, 0)
+        if value:
+            table[key] = value
+        else:
+            table.pop(key, None)
+
+    def add(self, rows, sign=1):
+        """
+        Adds the rows to the cube (sign=-1 removes them).
+        """
+        dates = pd.to_datetime(pd.Series(rows["date"]))
+        months = year_month(dates)
+        for month in months[rows["category"].isna().to_numpy()]:
+            self._bump(self.month_counts, month, sign)
+        rows = rows[rows["category"].notna()]
+        if rows.empty:
+            return
+        cents = np.round(pd.to_numeric(rows["amount"]).fillna(0).to_numpy() * 100)
+        for category, account, month, amount in zip(
+            rows["category"], rows["account"], months[rows.index], cents
+        ):
+            amount = sign * int(amount)
+            virtual = account == "Virtual"
+            key = (account, category, month)
+            cell = self.cells.setdefault(key, [0, 0])
+            cell[0] += amount
+            cell[1] += sign
+            if not cell[1]:
+                del self.cells[key]
+            self._bump(self.totals, (category, virtual), amount)
+            self._bump(self.accounts.setdefault(account, {}), category, amount)
+            self._bump(self.months.setdefault(month, {}), (category, virtual), amount)
+            self._bump(self.month_counts, month, sign)
+
+    def category_sums(self, months=None, virtual=None, account=None):
+        """
+        Returns the balance per category, over the given year-month keys (all
+        the history by default), for virtual or real operations or both, and
+        for one account or all of them.
+        """
+        if account is not None:
+            if virtual is not None and virtual != (account == "Virtual"):
+                return pd.Series(dtype=float)
+            if months is None:
+                sums = self.accounts.get(account, {})
+            else:
+                months = set(months)
+                sums = {}
+                for (cell_account, category, month), (cents, _) in self.cells.items():
+                    if cell_account == account and month in months:
+                        sums[category] = sums.get(category, 0) + cents
+            return pd.Series(sums, dtype=float) / 100
+        if months is None:
+            tables = [self.totals]
+        else:
+            tables = [self.months.get(month, {}) for month in months]
+        sums = {}
+        for table in tables:
+            for (category, is_virtual), cents in table.items():
+                if virtual is None or is_virtual == virtual:
+                    sums[category] = sums.get(category, 0) + cents
+        return pd.Series(sums, dtype=float) / 100
+
+    def years(self):
+        """
+        Returns the years having operations, in order.
+        """
+        return sorted({month // 100 for month in self.month_counts if month})
+
+    def months_of(self, year):
+        """
+        Returns the months of a year having operations, in order.
+        """
+        year = int(year)
+        return sorted(month % 100 for month in self.month_counts if month // 100 == year)
+
+
+class DateIndex:
+    """
+    Index des opérations triées par date : dates (entiers en ns), clés
+    année-mois, et pour chaque compte les positions de ses opérations. Les
+    dates manquantes sont placées à la fin. Les requêtes par période sont des
+    recherches dichotomiques (searchsorted) au lieu de masques booléens.
+    """
+
+    MISSING = np.iinfo(np.int64).max
+
+    def __init__(self, operations):
+        dates = operations["date"]
+        missing = dates.isna().to_numpy()
+        self.dates = dates.to_numpy(dtype="datetime64[ns]").view("int64").copy()
+        self.dates[missing] = self.MISSING
+        self.months = year_month(dates).to_numpy().copy()
+        self.months[missing] = self.MISSING
+        self.accounts = {
+            account: (positions, self.dates[positions], self.months[positions])
+            for account, positions in operations.groupby("account", sort=False).indices.items()
+        }
+
+    def positions(self, start=None, end=None, account=None):
+        """
+        Returns the positions of the operations within [start, end), a slice
+        when no account is given.
+        """
+        if account is None:
+            positions, dates, months = None, self.dates, self.months
+        else:
+            empty = np.array([], dtype="int64")
+            positions, dates, months = self.accounts.get(account, (empty, empty, empty))
+        month_range = (
+            _month_range(start, end) if start is not None and end is not None else None
+        )
+        if month_range:
+            low = np.searchsorted(months, month_range[0], "left")
+            high = np.searchsorted(months, month_range[-1], "right")
+        else:
+            low = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).value)
+            if end is not None:
+                high = np.searchsorted(dates, pd.Timestamp(end).value)
+            elif start is not None:
+                high = np.searchsorted(dates, self.MISSING)
+            else:
+                high = len(dates)
+        if positions is None:
+            return slice(int(low), int(high))
+        return positions[low:high]
+
+
+def _dedup_keys(operations):
+    """
+    Returns a stable 64-bit hash per operation of (account, day, normalized label,
+    amount in cents), used to recognize operations that were already imported.
+    """
+    if operations.empty:
+        return np.array([], dtype="uint64")
+    labels = (
+        operations["name"]
+        .astype(str)
+        .fillna("nan")
+        .str.upper()
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    # Les valeurs manquantes ont leur propre clé ("nan", "NaT", "<NA>")
+    days = (
+        pd.to_datetime(operations["date"], errors="coerce")
+        .dt.strftime("%Y-%m-%d")
+        .fillna("NaT")
+    )
+    cents = (
+        (pd.to_numeric(operations["amount"], errors="coerce") * 100)
+        .round()
+        .astype("Int64")
+        .astype(str)
+        .fillna("<NA>")
+    )
+    content = (
+        operations["account"].astype(str).fillna("nan")
+        + "|"
+        + days
+        + "|"
+        + labels
+        + "|"
+        + cents
+    )
+    return pd.util.hash_array(content.to_numpy(dtype=object))
+
+
+def _parse_amounts(amounts):
+    """
+    Converts amounts written with French decimal commas and spaces to floats.
+    Amounts already converted when the file was read are returned as is.
+    """
+    if pd.api.types.is_numeric_dtype(amounts):
+        return amounts
+    return pd.to_numeric(
+        amounts.replace(",", ".", regex=True).replace(r"\s", "", regex=True),
+        errors="coerce",
+    )
+
+
+class ParsedStatement:
+    """
+    Résultat de la lecture d'un relevé : opérations (date, name, amount),
+    numéro de compte et historique de solde fourni par la banque.
+    """
+
+    def __init__(self, bank, operations, account_num=None, balance=None):
+        self.bank = bank
+        self.operations = operations
+        self.account_num = account_num
+        self.balance = balance
+
+
+class StatementParser:
+    """
+    Lecteur d'un format de relevé bancaire.
+    Chaque sous-classe correspond à une entrée de DICTBANK : les noms de colonnes
+    de cette entrée forment la signature qui permet de reconnaître l'en-tête.
+    """
+
+    bank = None
+    date_format = None
+
+    def columns(self):
+        return DICTBANK[self.bank]
+
+    def matches(self, header):
+        """
+        Returns True if the header cells contain all the columns of this format.
+        """
+        return set(self.columns().values()) <= {str(cell).strip() for cell in header}
+
+    def parse(self, table, first_row):
+        """
+        Parses the table (read with its header) of a statement.
+        first_row holds the cells of the first line of the file.
+        """
+        columns = self.columns()
+        operations = pd.DataFrame(
+            {
+                "date": pd.to_datetime(
+                    table[columns["date"]], format=self.date_format
+                ),
+                "name": table[columns["name"]],
+                "amount": _parse_amounts(table[columns["amount"]]),
+            }
+        )
+        return ParsedStatement(
+            self.bank,
+            operations,
+            self.account_num(table, first_row),
+            self.balance(table, first_row, operations),
+        )
+
+    def account_num(self, table, first_row):
+        return None
+
+    def balance(self, table, first_row, operations):
+        return None
+
+
+class BNPParser(StatementParser):
+    bank = "BNP"
+    date_format = "%d-%m-%Y"
+    # Colonne de la première ligne du fichier contenant le solde
+    balance_cell = 5
+
+    def account_num(self, table, first_row):
+        return first_row[2]
+
+    def balance(self, table, first_row, operations):
+        return pd.DataFrame(
+            {
+                "date": [operations["date"].iloc[-1]],
+                "balance": _parse_amounts(pd.Series([first_row[self.balance_cell]])),
+            }
+        )
+
+
+class BNP2Parser(BNPParser):
+    bank = "BNP2"
+    balance_cell = 2
+
+
+class BoursoBankParser(StatementParser):
+    bank = "BoursoBank"
+
+    def account_num(self, table, first_row):
+        return table["accountNum"].iloc[0]
+
+    def balance(self, table, first_row, operations):
+        return pd.DataFrame(
+            {
+                "date": pd.to_datetime(table["dateOp"]),
+                "balance": _parse_amounts(table["accountbalance"]),
+            }
+        )
+
+
+class MappingParser(StatementParser):
+    """
+    Parser for an unknown format, built from a manual column mapping.
+    """
+
+    bank = "Mapping"
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def columns(self):
+        return self.mapping
+
+
+# Formats reconnus, dans l'ordre où ils sont essayés
+STATEMENT_PARSERS = [BNPParser(), BNP2Parser(), BoursoBankParser()]
+
+# Nombre de lignes examinées pour trouver l'en-tête
+HEADER_SEARCH_ROWS = 10
+
+
+def _find_header(rows, parsers):
+    """
+    Returns (row number, parser) of the first row matching a parser signature.
+    """
+    for i, row in enumerate(rows[:HEADER_SEARCH_ROWS]):
+        for parser in parsers:
+            if parser.matches(row):
+                return i, parser
+    return None, None
+
+
+# Options de lecture des exports CSV : montants à la française (1 234,56)
+CSV_OPTIONS = {"sep": ";", "decimal": ",", "thousands": " "}
+
+# Nombre de lignes lues à la fois par l'import CSV en flux
+CSV_CHUNK_SIZE = 20000
+
+
+def _csv_encoding(file):
+    """
+    Returns the encoding of a binary CSV file: UTF-8 (with or without BOM) when
+    the whole content decodes as UTF-8, otherwise Latin-1.
+    The file is checked block by block, so streamed and one-batch reads agree.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8-sig"
+
+
+def _sniff_csv(text, parsers):
+    """
+    Finds the header row and the format of a CSV file from its first lines.
+    Returns (header row, parser, cells of the first line).
+    """
+    rows = [
+        [cell.strip().strip('"') for cell in line.split(";")]
+        for line in text.splitlines()[:HEADER_SEARCH_ROWS]
+    ]
+    header_row, parser = _find_header(rows, parsers)
+    if parser is None:
+        raise ValueError("Unrecognized file format. Mapping required.")
+    return header_row, parser, rows[0]
+
+
+def read_statement(file_path, mapping=None):
+    """
+    Reads a bank statement (Excel or CSV) and returns a ParsedStatement.
+    The file is read from disk once; the header row and the bank format are
+    detected on the in-memory content.
+    A manual column mapping is used when no known format matches.
+    """
+    file_extension = file_path.split(".")[-1].lower()
+    parsers = STATEMENT_PARSERS + ([MappingParser(mapping)] if mapping else [])
+
+    if file_extension.startswith("xls"):
+        raw = pd.read_excel(file_path, header=None)
+        rows = raw.head(HEADER_SEARCH_ROWS).values.tolist()
+        header_row, parser = _find_header(rows, parsers)
+        if parser is None:
+            raise ValueError("Unrecognized file format. Mapping required.")
+        table = raw.iloc[header_row + 1 :].reset_index(drop=True)
+        table.columns = [str(cell).strip() for cell in raw.iloc[header_row]]
+        table = table.infer_objects()
+        first_row = raw.iloc[0].tolist()
+    elif file_extension == "csv":
+        with open(file_path, "rb") as file:
+            content = file.read()
+        encoding = _csv_encoding(io.BytesIO(content))
+        text = content.decode(encoding)
+        header_row, parser, first_row = _sniff_csv(text, parsers)
+        table = pd.read_csv(io.StringIO(text), skiprows=header_row, **CSV_OPTIONS)
+    else:
+        raise ValueError(
+            "Unsupported file type. Only Excel and CSV files are supported."
+        )
+
+    statement = parser.parse(table, first_row)
+    if statement.operations.empty:
+        raise ValueError("No data loaded.")
+    return statement
+
+
+def iter_statement(file_path, mapping=None, chunksize=None):
+    """
+    Yields the ParsedStatement of a statement file. With a chunksize, CSV files
+    are streamed: one ParsedStatement per chunk of rows, so memory stays bounded
+    whatever the size of the export. Other files are yielded in one piece.
+    """
+    if chunksize is None or not file_path.lower().endswith(".csv"):
+        yield read_statement(file_path, mapping=mapping)
+        return
+
+    parsers = STATEMENT_PARSERS + ([MappingParser(mapping)] if mapping else [])
+    with open(file_path, "rb") as file:
+        encoding = _csv_encoding(file)
+        file.seek(0)
+        head = file.read(1 << 16)
+    text = head.decode(encoding, errors="ignore")
+    header_row, parser, first_row = _sniff_csv(text, parsers)
+
+    empty = True
+    with open(file_path, "r", encoding=encoding, newline="") as file:
+        for table in pd.read_csv(
+            file, skiprows=header_row, chunksize=chunksize, **CSV_OPTIONS
+        ):
+            statement = parser.parse(table, first_row)
+            if not statement.operations.empty:
+                empty = False
+                yield statement
+    if empty:
+        raise ValueError("No data loaded.")
+
+
+class ImportResult:
+    """
+    Compte rendu de l'import d'un relevé : compte concerné, opérations ajoutées
+    et ignorées, période couverte, dernier solde fourni par la banque, durées,
+    ou message d'erreur.
+    """
+
+    def __init__(
+        self,
+        file=None,
+        bank=None,
+        account=None,
+        account_num=None,
+        new_account=False,
+        added=0,
+        ignored=0,
+        balance=None,
+        parse_time=0.0,
+        merge_time=0.0,
+        error=None,
+        skipped=False,
+        start=None,
+        end=None,
+        categorized=0,
+    ):
+        self.file = file
+        self.bank = bank
+        self.account = account
+        self.account_num = account_num
+        self.new_account = new_account
+        self.added = added
+        self.ignored = ignored
+        self.balance = balance
+        self.parse_time = parse_time
+        self.merge_time = merge_time
+        self.error = error
+        self.skipped = skipped
+        self.start = start
+        self.end = end
+        self.categorized = categorized
+
+    def __str__(self):
+        name = os.path.basename(self.file) if self.file else "?"
+        if self.error:
+            return f"{name}: ERROR {self.error} ({self.parse_time:.2f}s)"
+        if self.skipped:
+            return f"{name}: already imported ({self.account}), skipped"
+        account = f"{self.account} (new)" if self.new_account else self.account
+        return (
+            f"{name}: {account}, {self.added} added ({self.categorized} categorized), "
+            f"{self.ignored} ignored "
+            f"(parse {self.parse_time:.2f}s, merge {self.merge_time:.2f}s)"
+        )
+
+
+def format_import_report(results):
+    """
+    Returns a per-file import report, one line per ImportResult.
+    """
+    return "\n".join(str(result) for result in results)
+
+
+def format_startup_report(times):
+    """
+    Returns the startup timings (phase -> seconds) on one line.
+    """
+    return "Startup: " + ", ".join(
+        f"{phase} {seconds:.2f}s" for phase, seconds in times.items()
+    )
+
+
+def file_fingerprint(file_path):
+    """
+    Returns the SHA-256 of the file content with its size and modification time.
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return {"sha256": digest.hexdigest(), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _error_message(error):
+    """
+    Message of an import error for the report; unexpected exception types
+    (KeyError, BadZipFile...) are named, their message alone is often unclear.
+    """
+    if isinstance(error, (ValueError, OSError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def _read_statement_timed(file_path):
+    """
+    Process pool worker: returns (file_path, ParsedStatement or error message, seconds).
+    Any parse failure is returned as the error of that file, so one bad file
+    does not abort the whole folder import.
+    """
+    start = time.perf_counter()
+    try:
+        statement = read_statement(file_path)
+    except Exception as e:
+        statement = _error_message(e)
+    return file_path, statement, time.perf_counter() - start
+
+
+def _statement_files(source):
+    """
+    Returns the statement files of a directory, or the files matching a glob pattern.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    statements = []
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        if os.path.isfile(path) and (extension.startswith(".xls") or extension == ".csv"):
+            statements.append(path)
+    return sorted(statements)
+
+
+def _is_categorized(categories):
+    """
+    Masks the categories actually assigned (neither "NC" nor empty).
+    """
+    return categories.notna() & (categories != "NC")
+
+
+def _trie_pattern(keywords):
+    """
+    Builds a regular expression matching any of the keywords, factored as a
+    trie: at each position the regex engine follows one branch per character
+    instead of trying every keyword in turn. The longest keyword wins.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if "" in node else pattern
+
+    return build(trie)
+
+
+class RuleEngine:
+    """
+    Règles de catégorisation compilées : tous les mots-clés sont réunis dans une
+    seule expression régulière en arbre (trie), appliquée en une passe à une
+    série de libellés.
+    Comme dans le dialogue de catégorisation, la première règle (dans l'ordre
+    du dictionnaire) dont le mot-clé figure dans le libellé en majuscules gagne.
+    """
+
+    def __init__(self, rules):
+        self.rules = dict(rules)
+        keywords = [keyword for keyword in self.rules if keyword]
+        self.categories = [self.rules[keyword] for keyword in keywords]
+        rank = {keyword: i for i, keyword in enumerate(keywords)}
+        # À chaque position seul le mot-clé le plus long est trouvé : il
+        # implique aussi ceux qui en sont un préfixe
+        self.implied = {
+            keyword: frozenset(
+                rank[other] for other in keywords if keyword.startswith(other)
+            )
+            for keyword in keywords
+        }
+        self.pattern = None
+        if keywords:
+            self.pattern = re.compile("(?=(" + _trie_pattern(keywords) + "))")
+
+    def matches(self, labels):
+        """
+        Returns, for each label, the ranks of all the rules it matches.
+        Each distinct label is scanned once.
+        """
+        labels = pd.Series(labels, dtype=object).fillna("").astype(str)
+        unique = pd.unique(labels.values)
+        if self.pattern is None:
+            found = [frozenset()] * len(unique)
+        else:
+            found = [
+                frozenset().union(
+                    *(self.implied[keyword] for keyword in self.pattern.findall(label.upper()))
+                )
+                for label in unique
+            ]
+        return pd.Series(found, index=unique).reindex(labels.values).set_axis(
+            labels.index
+        )
+
+    def categorize(self, labels, confident=False):
+        """
+        Returns the category of each label, missing (NaN) when no rule matches.
+        With confident=True, labels whose matching rules disagree on the
+        category are left missing as well.
+        """
+        return self.choose(self.matches(labels), confident)
+
+    def conflicts(self, matches):
+        """
+        Masks the labels matched by rules giving different categories.
+        """
+        return matches.map(
+            lambda ranks: len({self.categories[rank] for rank in ranks}) > 1
+        ).astype(bool)
+
+    def choose(self, matches, confident=False):
+        """
+        Returns the category chosen for each set of matching rule ranks.
+        """
+
+        def category(ranks):
+            if not ranks:
+                return None
+            if confident and len({self.categories[rank] for rank in ranks}) > 1:
+                return None
+            return self.categories[min(ranks)]
+
+        return matches.map(category)
+
+
+class RuleStats:
+    """
+    Statistiques des règles de catégorisation : nombre d'opérations reconnues
+    par chaque mot-clé, nombre de fois où il a décidé de la catégorie, conflits
+    (plusieurs règles de catégories différentes pour un libellé), dates de la
+    première et de la dernière opération reconnue, et durée de chaque passe.
+    """
+
+    MAX_BATCHES = 200
+
+    def __init__(self):
+        self.rules = {}
+        self.batches = []
+        self.total_operations = 0
+        self.total_time = 0.0
+
+    def record(self, engine, matches, chosen, dates, seconds, source):
+        """
+        Records one categorization pass: matches are the rule ranks of each
+        operation, chosen the category assigned (missing if none), dates the
+        operation dates.
+        """
+        conflicts = engine.conflicts(matches) if len(matches) else matches.astype(bool)
+        ranks = matches.map(sorted).explode().dropna()
+        if not ranks.empty:
+            frame = pd.DataFrame(
+                {
+                    "rank": ranks.astype(int).values,
+                    "date": dates.loc[ranks.index].values,
+                    "conflict": conflicts.loc[ranks.index].values,
+                }
+            )
+            winners = matches[chosen.notna()].map(min).value_counts()
+            grouped = frame.groupby("rank").agg(
+                hits=("date", "size"),
+                conflicts=("conflict", "sum"),
+                first=("date", "min"),
+                last=("date", "max"),
+            )
+            keywords = [keyword for keyword in engine.rules if keyword]
+            for rank, row in grouped.iterrows():
+                stats = self.rules.setdefault(
+                    keywords[rank],
+                    {"hits": 0, "wins": 0, "conflicts": 0, "first": None, "last": None},
+                )
+                stats["hits"] += int(row["hits"])
+                stats["wins"] += int(winners.get(rank, 0))
+                stats["conflicts"] += int(row["conflicts"])
+                first = pd.Timestamp(row["first"]).isoformat()
+                last = pd.Timestamp(row["last"]).isoformat()
+                stats["first"] = min(stats["first"] or first, first)
+                stats["last"] = max(stats["last"] or last, last)
+
+        self.total_operations += len(matches)
+        self.total_time += seconds
+        self.batches.append(
+            {
+                "at": pd.Timestamp.now().isoformat(timespec="seconds"),
+                "source": source,
+                "operations": len(matches),
+                "categorized": int(chosen.notna().sum()),
+                "conflicts": int(conflicts.sum()),
+                "rules": len(engine.categories),
+                "seconds": seconds,
+            }
+        )
+        del self.batches[: -self.MAX_BATCHES]
+
+    def report(self, rules):
+        """
+        Returns one row per current rule, rules that never matched included,
+        the least used first.
+        """
+        report = pd.DataFrame(
+            [
+                {
+                    "keyword": keyword,
+                    "category": category,
+                    **self.rules.get(
+                        keyword,
+                        {"hits": 0, "wins": 0, "conflicts": 0, "first": None, "last": None},
+                    ),
+                }
+                for keyword, category in rules.items()
+            ],
+            columns=["keyword", "category", "hits", "wins", "conflicts", "first", "last"],
+        )
+        return report.sort_values(["hits", "wins"], kind="stable").reset_index(drop=True)
+
+    def summary(self):
+        """
+        One line describing the cost of the rule passes.
+        """
+        if not self.batches:
+            return "No categorization pass recorded."
+        last = self.batches[-1]
+        per_thousand = 1000 * self.total_time / max(self.total_operations, 1)
+        return (
+            f"{self.total_operations} operations matched in {self.total_time:.3f}s "
+            f"({per_thousand * 1000:.1f} ms per 1000 operations); last pass: "
+            f"{last['operations']} operations, {last['categorized']} categorized, "
+            f"{last['conflicts']} conflicts in {last['seconds'] * 1000:.1f} ms"
+        )
+
+    def to_dict(self):
+        return {
+            "rules": self.rules,
+            "batches": self.batches,
+            "total_operations": self.total_operations,
+            "total_time": self.total_time,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls()
+        stats.rules = state.get("rules", {})
+        stats.batches = state.get("batches", [])
+        stats.total_operations = state.get("total_operations", 0)
+        stats.total_time = state.get("total_time", 0.0)
+        return stats
+
+
+class LabelClassifier:
+    """
+    Classifieur bayésien naïf multinomial sur les n-grammes de caractères des
+    libellés. Il apprend libellé par libellé (learn/forget), sans ré-entraînement,
+    et prédit en une passe la catégorie d'une série de libellés.
+    """
+
+    NGRAM_SIZES = (3, 4)
+    # Nombre de libellés appris ou oubliés (pour ne sauvegarder que si besoin)
+    changes = 0
+
+    def __init__(self):
+        self.class_counts = {}  # catégorie -> nombre de libellés appris
+        self.total_counts = {}  # catégorie -> nombre de n-grammes appris
+        self.feature_counts = {}  # n-gramme -> {catégorie: occurrences}
+
+    @classmethod
+    def ngrams(cls, label):
+        """
+        Returns the character n-grams of a label, upper-cased and without digits
+        (dates and card numbers change from one operation to the next).
+        """
+        text = " " + " ".join(re.sub(r"\d+", " ", str(label).upper()).split()) + " "
+        return [
+            text[i : i + size]
+            for size in cls.NGRAM_SIZES
+            for i in range(len(text) - size + 1)
+        ]
+
+    def _update(self, label, category, weight):
+        self.changes += 1
+        grams = self.ngrams(label)
+        count = self.class_counts.get(category, 0) + weight
+        if count <= 0:
+            self.class_counts.pop(category, None)
+            self.total_counts.pop(category, None)
+        else:
+            self.class_counts[category] = count
+            self.total_counts[category] = max(
+                self.total_counts.get(category, 0) + weight * len(grams), 0
+            )
+        for gram in grams:
+            per_class = self.feature_counts.setdefault(gram, {})
+            count = per_class.get(category, 0) + weight
+            if count > 0:
+                per_class[category] = count
+            else:
+                per_class.pop(category, None)
+                if not per_class:
+                    del self.feature_counts[gram]
+
+    def learn(self, labels, categories):
+        """
+        Adds labels with their category to the model.
+        """
+        for label, category in zip(labels, categories):
+            self._update(label, category, 1)
+
+    def forget(self, labels, categories):
+        """
+        Removes labels previously learned with this category.
+        """
+        for label, category in zip(labels, categories):
+            self._update(label, category, -1)
+
+    def predict(self, labels):
+        """
+        Returns a DataFrame (category, confidence) aligned with the labels; the
+        confidence is the posterior probability of the category. Each distinct
+        label is scored once, against all categories in a single matrix product.
+        """
+        labels = pd.Series(labels, dtype=object).fillna("").astype(str)
+        classes = list(self.class_counts)
+        if not classes:
+            return pd.DataFrame(
+                {"category": None, "confidence": 0.0}, index=labels.index
+            )
+        unique = pd.unique(labels.values)
+        vocabulary = {gram: i for i, gram in enumerate(self.feature_counts)}
+        rows = {category: i for i, category in enumerate(classes)}
+        counts = np.zeros((len(classes), len(vocabulary)))
+        for gram, per_class in self.feature_counts.items():
+            for category, count in per_class.items():
+                counts[rows[category], vocabulary[gram]] = count
+        totals = np.array([self.total_counts.get(category, 0) for category in classes])
+        log_likelihood = np.log(counts + 1) - np.log(totals + len(vocabulary))[:, None]
+        priors = np.array([self.class_counts[category] for category in classes])
+        scores = np.tile(np.log(priors / priors.sum()), (len(unique), 1))
+
+        # Somme des log-vraisemblances des n-grammes connus de chaque libellé
+        ids, offsets = [], [0]
+        for label in unique:
+            ids.extend(vocabulary[gram] for gram in self.ngrams(label) if gram in vocabulary)
+            offsets.append(len(ids))
+        if ids:
+            cumulative = np.zeros((len(classes), len(ids) + 1))
+            cumulative[:, 1:] = log_likelihood[:, ids].cumsum(axis=1)
+            scores += (cumulative[:, offsets[1:]] - cumulative[:, offsets[:-1]]).T
+
+        probabilities = np.exp(scores - scores.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        predictions = pd.DataFrame(
+            {
+                "category": np.array(classes, dtype=object)[best],
+                "confidence": probabilities.max(axis=1),
+            },
+            index=unique,
+        )
+        return predictions.reindex(labels.values).set_axis(labels.index)
+
+    def to_dict(self):
+        return {
+            "class_counts": self.class_counts,
+            "total_counts": self.total_counts,
+            "feature_counts": self.feature_counts,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        classifier = cls()
+        classifier.class_counts = state["class_counts"]
+        classifier.total_counts = state["total_counts"]
+        classifier.feature_counts = state["feature_counts"]
+        return classifier
+
+
+# Confiance minimale pour proposer la catégorie prédite par le classifieur
+CLASSIFIER_MIN_CONFIDENCE = 0.6
+
+
+class BudgetManager:
+    """
+    Gère les comptes et les opérations budgétaires.
+    Les opérations sont stockées dans un DataFrame avec les colonnes spécifiées.
+    """
+
+    # Taille du journal (en opérations, voir _journal_size) au-delà de laquelle
+    # une sauvegarde réécrit le snapshot
+    COMPACT_EVERY = 500
+
+    def __init__(
+        self,
+        save_file="budget_data.pkl",
+        rules_file="categorization_rules.json",
+        journal_fsync="save",
+    ):
+        self.rules_file = rules_file
+        self.categorization_rules = self.load_categorization_rules()
+        self.accounts = {}
+        self.categories = [
+            "Revenus",
+            "Maison",
+            "Alimentation",
+            "Transport",
+            "Sortie",
+            "Santé",
+            "NC",
+            "Interne",
+        ]
+        self._buffer = {col: [] for col in OPERATION_COLUMNS}
+        self._next_id = 0
+        self._id_index = {}
+        self._dedup_counts = None
+        self._cube = None
+        self._dates = None
+        self._version = 0
+        self._query_cache = {}
+        self._balances = None
+        self._rule_engine = None
+        self._rule_stats = None
+        self.classifier = None
+        # (classifieur, changes) à la dernière sauvegarde en colonnes
+        self._saved_classifier = None
+        self.import_ledger = {}
+        # Partitions du stockage en colonnes pas encore chargées (load_recent)
+        self.history_pending = []
+        self.operations = pd.DataFrame(columns=OPERATION_COLUMNS)
+        self.operations
+        self.save_file = save_file
+        self.journal_file = save_file + ".journal"
+        self.journal_fsync = journal_fsync
+        self.journal_seq = 0
+        self._journal_length = 0
+        self._pending_journal = []
+        self._replaying = False
+
+    def __getstate__(self):
+        self._flush_buffer()
+        state = self.__dict__.copy()
+        state["_pending_journal"] = []
+        state["_dedup_counts"] = None
+        state["_cube"] = None
+        state["_dates"] = None
+        state["_query_cache"] = {}
+        state["_balances"] = None
+        state["_saved_classifier"] = None
+        state["_rule_engine"] = None
+        state["_rule_stats"] = None
+        return state
+
+    def __setstate__(self, state):
+        # Les sauvegardes créées avant le journal n'ont pas ces attributs
+        if "operations" in state:
+            state["_operations"] = state.pop("operations")
+        state["_buffer"] = {col: [] for col in OPERATION_COLUMNS}
+        state.setdefault("_next_id", 0)
+        state.setdefault("journal_file", state["save_file"] + ".journal")
+        state.setdefault("journal_fsync", "save")
+        state.setdefault("journal_seq", 0)
+        state.setdefault("_journal_length", 0)
+        state.setdefault("_pending_journal", [])
+        state.setdefault("_replaying", False)
+        # Index SQLite des anciennes versions, abandonné
+        state.pop("sqlite_file", None)
+        state.pop("_sqlite", None)
+        state.setdefault("import_ledger", {})
+        state.setdefault("classifier", None)
+        state.setdefault("history_pending", [])
+        self.__dict__.update(state)
+        self._dedup_counts = None
+        self._cube = None
+        self._dates = None
+        self._version = state.get("_version", 0)
+        self._query_cache = {}
+        self._balances = None
+        self._saved_classifier = None
+        self._rule_engine = None
+        self._rule_stats = None
+        self._ensure_ids()
+
+    def _ensure_ids(self):
+        """
+        Gives an id to the operations that have none (data saved before ids
+        existed) and rebuilds the id -> index hash map.
+        """
+        operations = self.operations
+        if "id" not in operations:
+            operations = operations.reindex(columns=OPERATION_COLUMNS)
+        missing = operations["id"].isna()
+        if missing.any():
+            operations = operations.copy()
+            if not missing.all():
+                self._next_id = max(self._next_id, int(operations["id"].max()) + 1)
+            operations.loc[missing, "id"] = range(
+                self._next_id, self._next_id + int(missing.sum())
+            )
+        operations["id"] = operations["id"].astype("int64")
+        self._operations = operations
+        if not operations.empty:
+            self._next_id = max(self._next_id, int(operations["id"].max()) + 1)
+        self._id_index = dict(zip(operations["id"], operations.index))
+
+    def _journal(self):
+        return OperationJournal(self.journal_file, self.journal_fsync)
+
+    def _record(self, op, **data):
+        """
+        Records a mutation in the journal. Depending on the fsync policy the entry
+        is written immediately or kept in memory until the next save.
+        """
+        self._changed()
+        if self._replaying or self.journal_file is None:
+            return
+        self.journal_seq += 1
+        entry = {"seq": self.journal_seq, "op": op, **data}
+        if self.journal_fsync == "always":
+            self._journal().append([entry])
+            self._journal_length += _journal_size([entry])
+        else:
+            self._pending_journal.append(entry)
+
+    @property
+    def operations(self):
+        """
+        DataFrame of all operations, including the rows still buffered.
+        """
+        self._flush_buffer()
+        return self._operations
+
+    @operations.setter
+    def operations(self, operations):
+        self._flush_buffer()
+        self._operations = operations
+        self._dedup_counts = None
+        self._cube = None
+        self._dates = None
+        self._changed()
+
+    def _buffer_rows(self, rows):
+        """
+        Buffers new operation rows in per-column lists. They are materialized in a
+        single concat the next time the operations are read, so adding many
+        operations in a row no longer copies the whole DataFrame each time.
+        Returns the rows as journal records.
+        """
+        for row in rows:
+            row["id"] = self._next_id
+            self._next_id += 1
+            row["date"] = pd.Timestamp(row["date"])
+            for col in OPERATION_COLUMNS:
+                self._buffer[col].append(row[col])
+        added = pd.DataFrame(rows, columns=OPERATION_COLUMNS)
+        self._aggregate(added)
+        self._learn_categories(after=added)
+        self._changed()
+        return rows
+
+    def _flush_buffer(self):
+        """
+        Materializes the buffered rows into the operations DataFrame.
+        """
+        if not self._buffer["date"]:
+            return
+        rows = pd.DataFrame(self._buffer, columns=OPERATION_COLUMNS)
+        self._buffer = {col: [] for col in OPERATION_COLUMNS}
+        # Les soldes et le classifieur ont déjà été mis à jour à la mise en tampon
+        self._append_rows(rows, aggregate=False)
+
+    def flush(self):
+        """
+        Materializes the buffered operations immediately.
+        """
+        self._flush_buffer()
+
+    def _append_rows(self, rows, aggregate=True):
+        """
+        Appends operation rows to the DataFrame (after any buffered rows).
+        Rows without id get a new one; existing index labels are never changed.
+        Returns the appended rows.
+        """
+        operations = self.operations
+        rows = rows.reindex(columns=OPERATION_COLUMNS)
+        missing = rows["id"].isna()
+        if missing.any():
+            rows.loc[missing, "id"] = range(
+                self._next_id, self._next_id + int(missing.sum())
+            )
+        rows["id"] = rows["id"].astype("int64")
+        if not rows.empty:
+            self._next_id = max(self._next_id, int(rows["id"].max()) + 1)
+        start = int(operations.index.max()) + 1 if not operations.empty else 0
+        rows.index = pd.RangeIndex(start, start + len(rows))
+        if operations.empty:
+            self._operations = rows
+        else:
+            self._operations = pd.concat([operations, rows])
+        self._id_index.update(zip(rows["id"], rows.index))
+        if self._dedup_counts is not None:
+            self._count_keys(_dedup_keys(rows), 1)
+        self._dates = None
+        self._changed()
+        if aggregate:
+            self._aggregate(rows)
+            self._learn_categories(after=rows)
+        return rows
+
+    # Nombre de résultats de query() gardés en mémoire
+    QUERY_CACHE_SIZE = 32
+
+    @property
+    def version(self):
+        """
+        Data version, incremented by every change (used to invalidate caches).
+        """
+        return self._version
+
+    def _changed(self):
+        self._version += 1
+        self._query_cache.clear()
+
+    def query(
+        self, account=None, category=None, start=None, end=None, virtual=None, text=None
+    ):
+        """
+        Returns the operations matching all the given filters, in date order:
+        account, category (a name or a list of names), period [start, end),
+        virtual (True: virtual transfers only, False: real operations only) and
+        text (case-insensitive search in the label).
+        The period and account are resolved with the date index (a slice of the
+        sorted operations), the other filters are applied to that slice only.
+        Results are memoized until the next change; treat them as read-only.
+        Balances per category come from category_sums(), served by the cube.
+        """
+        if isinstance(category, (list, tuple, set)):
+            category = tuple(sorted(category))
+        key = (account, category, start, end, virtual, text or None)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.filter_operations(account, start, end)
+        if category is not None:
+            categories = category if isinstance(category, tuple) else (category,)
+            result = result[result["category"].isin(categories)]
+        if virtual is not None:
+            result = result[(result["account"] == "Virtual") == virtual]
+        if text:
+            result = result[
+                result["name"].astype(str).str.contains(text, case=False, regex=False)
+            ]
 
+        if len(self._query_cache) >= self.QUERY_CACHE_SIZE:
+            del self._query_cache[next(iter(self._query_cache))]
+        self._query_cache[key] = result
+        return result
 
-DICTBANK = {
-    "BNP": {
-        "date": "Date operation",
-        "name": "Libelle operation",
-        "amount": "Montant operation en euro",
-    },
-    "BNP2": {
-        "date": "Date operation",
-        "name": "Libelle operation",
-        "amount": "Montant operation",
-    },
-    "BoursoBank": {"date": "dateOp", "name": "label", "amount": "amount"},
-}
+    def date_index(self):
+        """
+        Keeps the operations sorted by date (index labels and ids unchanged)
+        and returns their DateIndex. Both are rebuilt lazily after a change that
+        may break the order; appending rows in date order keeps the sort cheap.
+        """
+        # Les lignes en tampon invalident l'index en étant matérialisées
+        self._flush_buffer()
+        if self._dates is None:
+            operations = self._operations
+            if not operations["date"].is_monotonic_increasing:
+                self._operations = operations.sort_values(
+                    "date", kind="stable", na_position="last"
+                )
+            self._dates = DateIndex(self._operations)
+        return self._dates
 
+    def cube(self):
+        """
+        Returns the operation cube (OperationCube), computed from all the
+        operations the first time, then kept up to date by each change.
+        """
+        if self._cube is None:
+            self._cube = OperationCube(self.operations)
+        return self._cube
 
-class BudgetManager:
-    """
-    Gère les comptes et les opérations budgétaires.
-    Les opérations sont stockées dans un DataFrame avec les colonnes spécifiées.
-    """
+    def _aggregate(self, rows, sign=1):
+        if self._cube is not None:
+            self._cube.add(rows, sign)
 
-    def __init__(
-        self, save_file="budget_data.pkl", rules_file="categorization_rules.json"
-    ):
-        self.rules_file = rules_file
-        self.categorization_rules = self.load_categorization_rules()
-        self.accounts = {}
-        self.categories = [
-            "Revenus",
-            "Maison",
-            "Alimentation",
-            "Transport",
-            "Sortie",
-            "Santé",
-            "NC",
-            "Interne",
-        ]
-        self.operations = pd.DataFrame(
-            columns=["date", "name", "account", "amount", "category", "Mensuel"]
-        )
-        self.operations
-        self.save_file = save_file
+    def _dedup_index(self):
+        """
+        Returns the import deduplication index: a hash map from the dedup key of
+        an operation (see _dedup_keys) to the number of operations having it.
+        The n-th occurrence of a key in an imported batch is a duplicate when
+        the history already holds at least n operations with that key, i.e. the
+        map stands for the set of (key, occurrence index) pairs.
+        It is built in one vectorized pass on first use, then kept up to date.
+        """
+        if self._dedup_counts is None:
+            self._dedup_counts = {}
+            self._count_keys(_dedup_keys(self.operations), 1)
+        return self._dedup_counts
+
+    def _count_keys(self, keys, delta):
+        counts = self._dedup_counts
+        for key in keys.tolist():
+            count = counts.get(key, 0) + delta
+            if count > 0:
+                counts[key] = count
+            else:
+                counts.pop(key, None)
+
+    def _drop_known_operations(self, rows, seen=None):
+        """
+        Returns (rows not imported yet, number of rows already in the history).
+        When a statement is merged in chunks, seen (one dict per statement)
+        carries for each key its count in the history before the statement
+        (taken the first time the key is met, before the statement added any)
+        and its occurrences in the previous chunks, so that streaming gives the
+        same result as a single batch.
+        """
+        keys = _dedup_keys(rows)
+        index = self._dedup_index()
+        if seen is None:
+            seen = {}
+        duplicate = np.zeros(len(keys), dtype=bool)
+        for position, key in enumerate(keys.tolist()):
+            counts = seen.get(key)
+            if counts is None:
+                counts = seen[key] = [index.get(key, 0), 0]
+            duplicate[position] = counts[1] < counts[0]
+            counts[1] += 1
+        return rows[~duplicate], int(duplicate.sum())
+
+    def _index_of(self, op_id):
+        """
+        Returns the DataFrame index label of an operation id.
+        """
+        self._flush_buffer()
+        try:
+            return self._id_index[op_id]
+        except KeyError:
+            raise ValueError(f"L'opération {op_id} n'existe pas.") from None
+
+    def get_operation(self, op_id):
+        """
+        Returns the operation with the given id.
+        """
+        return self.operations.loc[self._index_of(op_id)]
+
+    def filter_operations(self, account=None, start=None, end=None):
+        """
+        Returns the operations of an account and/or within [start, end), in date
+        order. The date index turns the period into a slice of the sorted
+        operations (positions of the account's operations when one is given).
+        """
+        positions = self.date_index().positions(start, end, account)
+        return self._operations.iloc[positions]
+
+    def category_sums(self, start=None, end=None, virtual=None, account=None):
+        """
+        Returns the sum of amounts per category within [start, end), for one
+        account or all of them.
+        virtual=True keeps only virtual operations, virtual=False only real ones.
+        Whole months (as given by period_bounds) are read from the operation
+        cube; other bounds use a date-index query.
+        """
+        if start is None and end is None:
+            return self.cube().category_sums(virtual=virtual, account=account)
+        months = _month_range(start, end) if start is not None and end is not None else None
+        if months is not None:
+            return self.cube().category_sums(months, virtual, account)
+        filtered = self.query(account=account, start=start, end=end, virtual=virtual)
+        return filtered.groupby("category")["amount"].sum()
 
     def load_categorization_rules(self):
         """
@@ -75,6 +1813,145 @@ class BudgetManager:
         """
         self.categorization_rules[keyword.upper()] = category
         self.save_categorization_rules()
+        self._record("rule", keyword=keyword.upper(), category=category)
+
+    def delete_categorization_rule(self, keyword):
+        """
+        Deletes a categorization rule.
+        """
+        del self.categorization_rules[keyword]
+        self.save_categorization_rules()
+        self._record("rule", keyword=keyword, category=None)
+
+    def rule_engine(self):
+        """
+        Returns the compiled categorization rules, recompiled when they change.
+        """
+        if self._rule_engine is None or self._rule_engine.rules != self.categorization_rules:
+            self._rule_engine = RuleEngine(self.categorization_rules)
+        return self._rule_engine
+
+    @property
+    def rule_stats_file(self):
+        """
+        The rule statistics are kept next to the rules, in <rules>_stats.json.
+        """
+        return os.path.splitext(self.rules_file)[0] + "_stats.json"
+
+    def rule_stats(self):
+        """
+        Returns the rule statistics (RuleStats), loaded from rule_stats_file.
+        """
+        if self._rule_stats is None:
+            try:
+                with open(self.rule_stats_file, "r", encoding="utf-8") as file:
+                    self._rule_stats = RuleStats.from_dict(json.load(file))
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._rule_stats = RuleStats()
+        return self._rule_stats
+
+    def save_rule_stats(self):
+        """
+        Saves the rule statistics if they were used.
+        """
+        if self._rule_stats is None:
+            return
+
+        def write_stats(path):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(self._rule_stats.to_dict(), file, ensure_ascii=False, indent=4)
+
+        _atomic_write(self.rule_stats_file, write_stats)
+
+    def _match_rules(self, rows, source, confident=False):
+        """
+        Categorizes rows with the rules and records the pass in the rule
+        statistics. Returns the categories (missing when no rule applies).
+        """
+        engine = self.rule_engine()
+        start = time.perf_counter()
+        matches = engine.matches(rows["name"])
+        categories = engine.choose(matches, confident)
+        elapsed = time.perf_counter() - start
+        self.rule_stats().record(
+            engine, matches, categories, rows["date"], elapsed, source
+        )
+        return categories
+
+    def suggest_category(self, label):
+        """
+        Returns the category proposed by the rules for a label, "NC" if none matches.
+        """
+        category = self.rule_engine().categorize([label]).iloc[0]
+        return "NC" if pd.isna(category) else category
+
+    def label_classifier(self):
+        """
+        Returns the label classifier, trained on the categorized operations the
+        first time; it is then kept up to date with each category change.
+        """
+        if self.classifier is None:
+            operations = self.operations
+            categorized = operations[_is_categorized(operations["category"])]
+            self.classifier = LabelClassifier()
+            self.classifier.learn(categorized["name"], categorized["category"])
+        return self.classifier
+
+    def _learn_categories(self, before=None, after=None):
+        """
+        Updates the classifier when operations change from the (name, category)
+        rows before to the rows after (before only: deleted rows, after only:
+        added rows).
+        """
+        if self.classifier is None:
+            return
+        if before is not None:
+            before = before[_is_categorized(before["category"])]
+            self.classifier.forget(before["name"], before["category"])
+        if after is not None:
+            after = after[_is_categorized(after["category"])]
+            self.classifier.learn(after["name"], after["category"])
+
+    def predict_categories(self, op_ids=None):
+        """
+        Predicts in one batch the category of the given operations (default:
+        the uncategorized ones). Returns a DataFrame (category, confidence)
+        indexed by operation id.
+        """
+        operations = self.operations
+        if op_ids is None:
+            rows = operations[~_is_categorized(operations["category"])]
+        else:
+            rows = operations.loc[[self._index_of(op_id) for op_id in op_ids]]
+        predictions = self.label_classifier().predict(rows["name"])
+        return predictions.set_axis(rows["id"].tolist())
+
+    def apply_rules(self, mask=None):
+        """
+        Categorizes operations with the rules in one vectorized pass.
+        mask selects the operations to categorize (default: the uncategorized
+        ones, "NC" or empty). Operations matching no rule are left unchanged.
+        Returns the number of operations categorized.
+        """
+        operations = self.operations
+        if mask is None:
+            mask = (operations["category"] == "NC") | operations["category"].isnull()
+        selected = operations.loc[mask]
+        categories = self._match_rules(selected, "apply_rules").dropna()
+        categories = categories[categories != selected.loc[categories.index, "category"]]
+        if categories.empty:
+            return 0
+        self.set_categories(selected.loc[categories.index, "id"].tolist(), categories.tolist())
+        return len(categories)
+
+    def add_category(self, category):
+        """
+        Adds a new category.
+        """
+        if not category or category in self.categories:
+            raise ValueError("Category already exists or is invalid.")
+        self.categories.append(category)
+        self._record("add_category", category=category)
 
     def add_account(self, account_name, account_num, account_balance=None):
         """
@@ -83,11 +1960,17 @@ class BudgetManager:
         if account_name in self.accounts:
             raise ValueError(f"Le compte '{account_name}' existe déjà.")
         if account_balance is None:
-            account_balance = pd.DataFrame({"date": pd.Timestamp.now(), "balance": 0})
+            account_balance = pd.DataFrame({"date": [pd.Timestamp.now()], "balance": [0]})
         self.accounts[account_name] = {
             "account_num": account_num,
             "account_balance": account_balance,
         }
+        self._record(
+            "add_account",
+            account=account_name,
+            account_num=account_num,
+            balance=_balance_to_records(account_balance),
+        )
 
     def add_operation(self, date, label, account, amount, category, monthly):
         """
@@ -103,19 +1986,607 @@ class BudgetManager:
             "category": category,
             "Mensuel": monthly,
         }
-        self.operations = pd.concat(
-            [self.operations, pd.DataFrame([new_op])], ignore_index=True
-        )
+        records = self._buffer_rows([new_op])
+        self._record("add_operation", rows=records)
         # self.operations.set_index('date', inplace=True)
 
-    def add_virtual_operation(self, from_category, to_category, amount, date):
+    def add_operations(self, operations: List[dict]):
+        """
+        Adds several operations at once. Each dict has the keys date, name, account,
+        amount and optionally category (default "NC") and Mensuel (default False).
+        """
+        for op in operations:
+            if op["account"] not in self.accounts:
+                raise ValueError(f"Le compte '{op['account']}' n'existe pas.")
+        records = self._buffer_rows(
+            [
+                {
+                    "date": op["date"],
+                    "name": op["name"],
+                    "account": op["account"],
+                    "amount": op["amount"],
+                    "category": op.get("category", "NC"),
+                    "Mensuel": op.get("Mensuel", False),
+                }
+                for op in operations
+            ]
+        )
+        self._record("add_operations", rows=records)
+
+    def edit_operation(self, op_id, **changes):
+        """
+        Updates the given columns of the operation with id op_id.
+        """
+        index = self._index_of(op_id)
+        before = self._operations.loc[[index]]
+        if self._dedup_counts is not None:
+            self._count_keys(_dedup_keys(before), -1)
+        for col, value in changes.items():
+            self._operations.at[index, col] = value
+        if self._dedup_counts is not None:
+            self._count_keys(_dedup_keys(self._operations.loc[[index]]), 1)
+        if "name" in changes or "category" in changes:
+            self._learn_categories(before, self._operations.loc[[index]])
+        if changes.keys() & {"date", "account"}:
+            self._dates = None
+        if changes.keys() & {"date", "account", "amount", "category"}:
+            self._aggregate(before, -1)
+            self._aggregate(self._operations.loc[[index]])
+        self._record("edit", id=op_id, changes=changes)
+
+    def set_categories(self, op_ids, categories):
+        """
+        Sets the category of several operations at once (one journal entry).
+        """
+        index = [self._index_of(op_id) for op_id in op_ids]
+        before = self._operations.loc[index]
+        self._operations.loc[index, "category"] = list(categories)
+        self._learn_categories(before, self._operations.loc[index])
+        self._aggregate(before, -1)
+        self._aggregate(self._operations.loc[index])
+        self._record("categorize", ids=list(op_ids), categories=list(categories))
+
+    def delete_operation(self, op_id):
+        """
+        Deletes the operation with id op_id.
+        """
+        index = self._index_of(op_id)
+        if self._dedup_counts is not None:
+            self._count_keys(_dedup_keys(self._operations.loc[[index]]), -1)
+        self._aggregate(self._operations.loc[[index]], -1)
+        self._learn_categories(before=self._operations.loc[[index]])
+        self._operations.drop(index, inplace=True)
+        self._dates = None
+        del self._id_index[op_id]
+        self._record("delete", id=op_id)
+
+    def import_operations_from_excel(
+        self,
+        file_path,
+        resolve_account=None,
+        mapping=None,
+        force=False,
+        chunksize=CSV_CHUNK_SIZE,
+        auto_categorize=True,
+        progress=None,
+    ):
+        """
+        Import operations from an Excel or CSV file and assign them to the correct account.
+        If the account number is not recognized, resolve_account(account_num, balance)
+        is called: it returns the name of an existing account to associate, or a new
+        name to create the account. Without resolver, unknown accounts raise ValueError.
+        A file already in the import ledger is skipped before parsing unless force is True.
+        CSV files are streamed chunksize rows at a time (None reads them at once);
+        the import is still all or nothing.
+        With auto_categorize, the new operations whose matching rules all agree
+        arrive categorized; the others are left "NC".
+        progress(done, total) is called after each chunk with the number of rows
+        read (total is None); an exception raised by it cancels the import.
+        Returns an ImportResult; nothing is displayed, so it can run headless.
+        """
+        known, fingerprint = self.find_imported_file(file_path)
+        if known is not None and not force:
+            return ImportResult(file=file_path, account=known["account"], skipped=True)
+        with self.transaction():
+            result = self._merge_statements(
+                iter_statement(file_path, mapping=mapping, chunksize=chunksize),
+                resolve_account,
+                self._categorize_batch if auto_categorize else None,
+                progress,
+            )
+            result.file = file_path
+            self._add_to_ledger(file_path, fingerprint, result)
+        return result
+
+    def import_folder(
+        self,
+        source,
+        resolve_account=None,
+        max_workers=None,
+        force=False,
+        auto_categorize=True,
+        progress=None,
+    ):
+        """
+        Imports every statement of a directory (or matching a glob pattern).
+        Files already in the import ledger are skipped without being parsed.
+        The other files are parsed concurrently in a process pool, then merged in
+        chronological order in a single transaction: if the merge fails, nothing
+        is imported. New operations are categorized by the rules as in
+        import_operations_from_excel.
+        progress(done, total) is called with the number of files merged; an
+        exception raised by it cancels the whole import.
+        Returns one ImportResult per file (see format_import_report).
+        """
+        files = _statement_files(source)
+        if not files:
+            raise ValueError(f"No statement file found in '{source}'.")
+
+        results = []
+        fingerprints = {}
+        for file_path in files:
+            known, fingerprint = self.find_imported_file(file_path)
+            if known is not None and not force:
+                results.append(
+                    ImportResult(file=file_path, account=known["account"], skipped=True)
+                )
+            else:
+                fingerprints[file_path] = fingerprint
+        files = list(fingerprints)
+        if progress is not None:
+            progress(0, len(files))
+
+        if len(files) == 1:
+            parsed = [_read_statement_timed(files[0])]
+        elif files:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                parsed = list(pool.map(_read_statement_timed, files))
+        else:
+            parsed = []
+
+        statements = []
+        for file_path, statement, elapsed in parsed:
+            if isinstance(statement, ParsedStatement):
+                statements.append((file_path, statement, elapsed))
+            else:
+                results.append(
+                    ImportResult(file=file_path, error=statement, parse_time=elapsed)
+                )
+        statements.sort(key=lambda item: item[1].operations["date"].min())
+
+        with self.transaction():
+            # Les fichiers illisibles comptent comme traités
+            failed = len(files) - len(statements)
+            for done, (file_path, statement, elapsed) in enumerate(statements, 1):
+                result = self._merge_statements(
+                    [statement],
+                    resolve_account,
+                    self._categorize_batch if auto_categorize else None,
+                )
+                result.file = file_path
+                result.parse_time = elapsed
+                self._add_to_ledger(file_path, fingerprints[file_path], result)
+                results.append(result)
+                if progress is not None:
+                    progress(failed + done, len(files))
+        return results
+
+    def _categorize_batch(self, rows):
+        """
+        Categories of a batch of imported operations: the rule category when all
+        the rules matching the label agree, "NC" otherwise.
+        """
+        return self._match_rules(rows, "import", confident=True).fillna("NC")
+
+    def find_imported_file(self, file_path):
+        """
+        Looks a statement file up in the import ledger.
+        Returns (ledger entry or None, fingerprint of the file). A file with the
+        same path, size and modification time as a ledger entry is recognized
+        without being read; otherwise its content hash is computed.
+        """
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        for entry in self.import_ledger.values():
+            if (entry["path"], entry["size"], entry["mtime"]) == (
+                path,
+                stat.st_size,
+                stat.st_mtime,
+            ):
+                return entry, {key: entry[key] for key in ("sha256", "size", "mtime")}
+        fingerprint = file_fingerprint(file_path)
+        return self.import_ledger.get(fingerprint["sha256"]), fingerprint
+
+    def _add_to_ledger(self, file_path, fingerprint, result):
+        entry = {
+            **fingerprint,
+            "path": os.path.abspath(file_path),
+            "account": result.account,
+            "start": result.start.isoformat(),
+            "end": result.end.isoformat(),
+            "added": result.added,
+            "imported_at": pd.Timestamp.now().isoformat(),
+        }
+        self.import_ledger[entry["sha256"]] = entry
+        self._record("ledger", entry=entry)
+
+    def _merge_statements(
+        self, statements, resolve_account=None, categorize=None, progress=None
+    ):
+        """
+        Merges the parsed chunks of one statement into the operations. Each chunk
+        is deduplicated against the operations already known, categorized with
+        categorize(batch) -> categories when given (otherwise "NC"), then
+        appended, so only one chunk is held in memory at a time.
+        progress(rows read, None) is called after each chunk when given.
+        Returns an ImportResult.
+        """
+        merge_time = 0.0
+        parse_start = time.perf_counter()
+        result = None
+        account_name = None
+        resolved = False
+        total = 0.0
+        latest = None
+        rows = 0
+        # Clés de déduplication déjà vues dans les morceaux précédents
+        seen = {}
+
+        for statement in statements:
+            start = time.perf_counter()
+            nbaccount = statement.account_num
+            accdf = statement.balance
+            df = statement.operations
+
+            if result is None:
+                result = ImportResult(bank=statement.bank, account_num=nbaccount)
+                # Check if account number exists
+                if nbaccount is not None:
+                    for acname, account in self.accounts.items():
+                        if nbaccount == account["account_num"]:
+                            account_name = acname
+                            break
+
+                # If account is not found
+                if account_name is None:
+                    if resolve_account is None:
+                        raise ValueError(f"Unknown account number {nbaccount}.")
+                    account_name = resolve_account(nbaccount, accdf)
+                    resolved = True
+                    if account_name not in self.accounts:
+                        result.new_account = True
+                        self.accounts[account_name] = {
+                            "account_num": nbaccount,
+                            "account_balance": pd.DataFrame(columns=["date", "balance"]),
+                        }
+                result.account = account_name
+                result.start = df["date"].min()
+                result.end = df["date"].max()
+            else:
+                result.start = min(result.start, df["date"].min())
+                result.end = max(result.end, df["date"].max())
+
+            # Update account balance
+            if accdf is not None and not accdf.empty:
+                self.accounts[account_name]["account_balance"] = pd.concat(
+                    [self.accounts[account_name]["account_balance"], accdf],
+                    ignore_index=True,
+                )
+                # Dernier solde du dernier jour (les relevés peuvent donner le
+                # solde après chaque opération)
+                last = accdf[accdf["date"] == accdf["date"].max()].iloc[-1]
+                if latest is None or last["date"] >= latest["date"]:
+                    latest = last
+            total += df["amount"].sum()
+
+            # Build operations DataFrame
+            newdf = pd.DataFrame(
+                {
+                    "date": df["date"],
+                    "name": df["name"],
+                    "account": account_name,
+                    "amount": df["amount"],
+                    "category": "NC",
+                    "Mensuel": False,
+                }
+            )
+            # Ignorer les opérations déjà présentes, quelle que soit leur date
+            newdf, ignored_operations = self._drop_known_operations(newdf, seen)
+            if categorize is not None and not newdf.empty:
+                newdf["category"] = categorize(newdf)
+                result.categorized += int((newdf["category"] != "NC").sum())
+
+            # Add the new operations to the main DataFrame
+            newdf = self._append_rows(newdf)
+            self._record_import(account_name, nbaccount, accdf, newdf)
+            result.added += len(newdf)
+            result.ignored += ignored_operations
+            merge_time += time.perf_counter() - start
+            rows += len(df)
+            if progress is not None:
+                progress(rows, None)
+
+        if result is None:
+            raise ValueError("No data loaded.")
+
+        # Compte inconnu : le solde initial est déduit du dernier solde connu
+        if resolved and latest is not None:
+            start = time.perf_counter()
+            initialop = pd.DataFrame(
+                {
+                    "date": [result.start],
+                    "name": "Initial balance for " + account_name,
+                    "account": account_name,
+                    "amount": round(latest["balance"] - total, 2),
+                    "category": self.categories[0],
+                    "Mensuel": False,
+                }
+            )
+            initialop = self._append_rows(initialop)
+            self._record_import(account_name, result.account_num, None, initialop)
+            merge_time += time.perf_counter() - start
+
+        if latest is not None:
+            result.balance = pd.DataFrame([latest]).reset_index(drop=True)
+        result.merge_time = merge_time
+        result.parse_time = time.perf_counter() - parse_start - merge_time
+        return result
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups several mutations: if an exception is raised inside the block,
+        operations, accounts, categories, rules and rule statistics are restored
+        and the journal entries of the block are dropped. With the "always" fsync policy the
+        entries are only written to the journal when the block succeeds.
+        """
+        operations = self.operations.copy()
+        accounts = copy.deepcopy(self.accounts)
+        categories = list(self.categories)
+        rules = dict(self.categorization_rules)
+        ledger = dict(self.import_ledger)
+        rule_stats = copy.deepcopy(self._rule_stats)
+        state = (self._next_id, dict(self._id_index), self.journal_seq)
+        pending = len(self._pending_journal)
+        fsync = self.journal_fsync
+        if fsync == "always":
+            self.journal_fsync = "save"
+        try:
+            yield self
+        except BaseException:
+            self._buffer = {col: [] for col in OPERATION_COLUMNS}
+            self._operations = operations
+            self.accounts = accounts
+            self.categories = categories
+            self.categorization_rules = rules
+            self.import_ledger = ledger
+            self._rule_stats = rule_stats
+            self._next_id, self._id_index, self.journal_seq = state
+            self._dedup_counts = None
+            self._cube = None
+            self._dates = None
+            self._changed()
+            self.classifier = None
+            del self._pending_journal[pending:]
+            raise
+        finally:
+            self.journal_fsync = fsync
+        if fsync == "always":
+            entries = self._pending_journal[pending:]
+            del self._pending_journal[pending:]
+            self._journal().append(entries)
+            self._journal_length += _journal_size(entries)
+
+    def _record_import(self, account_name, nbaccount, accdf, rows):
+        """
+        Records an import batch in the journal as a single entry.
+        """
+        self._record(
+            "import",
+            account=account_name,
+            account_num=nbaccount,
+            balance=_balance_to_records(accdf),
+            rows=_rows_to_records(rows),
+        )
+
+    def _apply_journal_entry(self, entry):
+        """
+        Replays one journal entry.
+        """
+        op = entry["op"]
+        if op in ("add_operation", "add_operations", "add_virtual_operation"):
+            self._append_rows(_records_to_rows(entry["rows"]))
+        elif op == "edit":
+            changes = entry["changes"]
+            if "date" in changes:
+                changes["date"] = pd.Timestamp(changes["date"])
+            self.edit_operation(entry["id"], **changes)
+        elif op == "delete":
+            self.delete_operation(entry["id"])
+        elif op == "categorize":
+            self.set_categories(entry["ids"], entry["categories"])
+        elif op == "import":
+            account = entry["account"]
+            balance = _records_to_balance(entry["balance"])
+            if account not in self.accounts:
+                self.accounts[account] = {
+                    "account_num": entry["account_num"],
+                    "account_balance": balance,
+                }
+            else:
+                self.accounts[account]["account_balance"] = pd.concat(
+                    [self.accounts[account]["account_balance"], balance],
+                    ignore_index=True,
+                )
+            self._append_rows(_records_to_rows(entry["rows"]))
+        elif op == "add_account":
+            self.add_account(
+                entry["account"],
+                entry["account_num"],
+                _records_to_balance(entry["balance"]),
+            )
+        elif op == "add_category":
+            self.add_category(entry["category"])
+        elif op == "ledger":
+            self.import_ledger[entry["entry"]["sha256"]] = entry["entry"]
+        elif op == "enable_sqlite":
+            # Index SQLite des anciennes versions, abandonné
+            pass
+        elif op == "rule":
+            if entry["category"] is None:
+                self.categorization_rules.pop(entry["keyword"], None)
+            else:
+                self.categorization_rules[entry["keyword"]] = entry["category"]
+        else:
+            raise ValueError(f"Unknown journal entry '{op}'.")
+
+    def replay_journal(self):
+        """
+        Replays the journal entries written after the last snapshot.
+        """
+        if self.journal_file is None:
+            return
+        entries = self._journal().read(after_seq=self.journal_seq)
+        self._replaying = True
+        try:
+            for entry in entries:
+                self._apply_journal_entry(entry)
+                self.journal_seq = entry["seq"]
+        finally:
+            self._replaying = False
+        self._journal_length = _journal_size(entries)
+
+    def _write_snapshot(self):
+        if self.save_file.endswith(".pkl"):
+
+            def write_pickle(path):
+                with open(path, "wb") as file:
+                    pickle.dump(self, file)
+
+            _atomic_write(self.save_file, write_pickle)
+        else:
+            ColumnarStore(self.save_file).save(self)
+
+    def compact(self):
+        """
+        Writes a full snapshot and empties the journal.
+        """
+        self._check_loaded()
+        self._pending_journal = []
+        self._write_snapshot()
+        if self.journal_file is not None:
+            self._journal().truncate()
+        self._journal_length = 0
+
+    def save_to_file(self):
+        """
+        Sauvegarde les données dans un fichier pickle, ou dans un stockage en
+        colonnes (Parquet) si save_file est un dossier plutôt qu'un fichier .pkl.
+        Seules les modifications depuis la dernière sauvegarde sont ajoutées au
+        journal ; le snapshot complet n'est réécrit que lorsque le journal porte
+        sur COMPACT_EVERY opérations.
+        """
+        self._check_loaded()
+        self.save_rule_stats()
+        if (
+            self.journal_file is None
+            or not os.path.exists(self.save_file)
+            or self._journal_length + _journal_size(self._pending_journal)
+            >= self.COMPACT_EVERY
+        ):
+            self.compact()
+            return
+        self._journal().append(self._pending_journal)
+        self._journal_length += _journal_size(self._pending_journal)
+        self._pending_journal = []
+
+    @staticmethod
+    def load_from_file(file_path: str):
+        """
+        Charge les données depuis un fichier pickle ou un stockage en colonnes,
+        puis rejoue le journal des modifications postérieures.
         """
-        Adds two virtual operations: one debiting 'from_category' and one crediting 'to_category'.
+        if os.path.isdir(file_path):
+            manager = BudgetManager(save_file=file_path)
+            ColumnarStore(file_path).load(manager)
+        else:
+            with open(file_path, "rb") as file:
+                manager = pickle.load(file)
+        manager.replay_journal()
+        return manager
+
+    @staticmethod
+    def load_recent(store_path):
+        """
+        Starts loading a columnar store with the latest year only, so that the
+        current period can be shown right away. The older years are listed in
+        history_pending: read them with read_history() (safe in a worker thread)
+        and add them with finish_loading(), which also replays the journal.
+        The data cannot be saved before.
+        """
+        store = ColumnarStore(store_path)
+        keys = store.partition_keys()
+        recent = sorted(key for key in keys if key.isdigit())[-1:]
+        manager = BudgetManager(save_file=store_path)
+        store.load(manager, recent)
+        manager.history_pending = [key for key in keys if key not in recent]
+        return manager
+
+    def read_history(self):
+        """
+        Reads the partitions listed in history_pending.
+        """
+        return ColumnarStore(self.save_file).read_partitions(self.history_pending)
+
+    def finish_loading(self, parts=None):
+        """
+        Adds the older operations read by read_history() (read now if not
+        given), then replays the journal as load_from_file does.
+        """
+        if parts is None:
+            parts = self.read_history()
+        if parts:
+            self.operations = (
+                pd.concat([self.operations, *parts])
+                .sort_index()
+                .reindex(columns=OPERATION_COLUMNS)
+            )
+            self._ensure_ids()
+        self.history_pending = []
+        ColumnarStore(self.save_file).read_classifier(self)
+        self.replay_journal()
+        return self
+
+    def _check_loaded(self):
+        if self.history_pending:
+            raise ValueError("The history is still loading, the data cannot be saved.")
+
+    @staticmethod
+    def migrate_to_columnar(pickle_path="budget_data.pkl", store_path="budget_data"):
+        """
+        Converts a pickle save file to the columnar storage backend.
+        The pickle file is kept untouched as a backup.
+        """
+        manager = BudgetManager.load_from_file(pickle_path)
+        manager.save_file = store_path
+        manager.journal_file = store_path + ".journal"
+        manager.compact()
+        return manager
+
+    def add_virtual_operation(self, from_category, to_category, amount, date=None):
+        """
+        Transfers money virtually from one category to another.
         """
         if from_category not in self.categories or to_category not in self.categories:
             raise ValueError("Invalid category provided.")
+        if from_category == "Revenus" and amount > self.get_category_balance(
+            from_category
+        ):
+            raise ValueError("Insufficient funds in 'Revenus' category.")
 
-        # Ajouter les opérations virtuelles
+        date = date or pd.Timestamp.now()
+
+        # Create two operations: one debit and one credit
         debit_op = {
             "date": date,
             "name": f"Transfer to {to_category}",
@@ -133,249 +2604,534 @@ class BudgetManager:
             "Mensuel": False,
         }
 
-        self.operations = pd.concat(
-            [self.operations, pd.DataFrame([debit_op, credit_op])], ignore_index=True
-        )
+        records = self._buffer_rows([debit_op, credit_op])
+        self._record("add_virtual_operation", rows=records)
 
-    def import_operations_from_excel(self, file_path, gui_instance, mapping=None):
+    def get_category_balance(self, category):
         """
-        Import operations from an Excel or CSV file and assign them to the correct account.
-        If the account number is not recognized, allow the user to associate it with an existing account,
-        create a new account, or cancel the import.
-        """
-        # Detect file type
-        file_extension = file_path.split(".")[-1].lower()
-
-        # Load the file into a DataFrame
-        if file_extension.startswith("xls"):
-            df = pd.read_excel(file_path, skiprows=self._detect_header_row(file_path))
-        elif file_extension == "csv":
-            df = pd.read_csv(
-                file_path, skiprows=self._detect_header_row(file_path), sep=";"
-            )
-        else:
-            raise ValueError(
-                "Unsupported file type. Only Excel and CSV files are supported."
-            )
+        Calculates the total balance for a given category.
+        """
+        totals = self.cube().totals
+        return (totals.get((category, False), 0) + totals.get((category, True), 0)) / 100
 
-        # Handle recognized formats
-        newdf = None
-        account_name = None
-        nbaccount= None
-        accdf = None
-        for bank, catnames in DICTBANK.items():
-            if catnames["amount"] in df:
-                if bank == "BoursoBank":
-                    nbaccount = df["accountNum"][0]
-                    accdf = pd.DataFrame(
-                        {"date": df["dateOp"], "balance": df["accountbalance"]}
-                    )
-                    df[catnames["date"]] = pd.to_datetime(
-                        df[catnames["date"]])
-
-                elif bank.startswith("BNP"):
-                    firstline = pd.read_excel(file_path, header=None, nrows=1)
-                    nbaccount = firstline.values[0, 2]
-                    idxbal = 5
-                    if bank == "BNP2":
-                        idxbal = 2
-                    accdf = pd.DataFrame(
-                        {
-                            "date": [df[catnames["date"]].iloc[-1]],
-                            "balance": [firstline.values[0, idxbal]],
-                        }
-                    )
-                    df[catnames["date"]] = pd.to_datetime(
-                        df[catnames["date"]],format="%d-%m-%Y")
+    def running_balances(self, account=None):
+        """
+        Returns the running balance of the accounts after each operation: one
+        grouped cumulative sum over the date-sorted operations (virtual
+        transfers and undated operations excluded). The initial balance
+        operation created at import starts each account's history.
+        Columns: id, date, account, amount, balance.
+        """
+        if self._balances is None or self._balances[0] != self.version:
+            operations = self.query()
+            operations = operations[
+                (operations["account"] != "Virtual") & operations["date"].notna()
+            ]
+            balances = operations[["id", "date", "account", "amount"]].copy()
+            balances["date"] = pd.to_datetime(balances["date"]).astype("datetime64[ns]")
+            balances["amount"] = pd.to_numeric(balances["amount"]).astype(float)
+            balances["balance"] = (
+                balances.groupby("account", sort=False)["amount"].cumsum().round(2)
+            )
+            self._balances = (self.version, balances)
+        balances = self._balances[1]
+        if account is not None:
+            balances = balances[balances["account"] == account]
+        return balances
 
-                # Check if account number exists
-                for acname, account in self.accounts.items():
-                    if nbaccount == account["account_num"]:
-                        account_name = acname
-                        break
-                df[catnames["amount"]] = pd.to_numeric(
-                    df[catnames["amount"]]
-                    .replace(",", ".", regex=True)
-                    .replace(r"\s", "", regex=True),
-                    errors="coerce",
-                )
-                # If account is not found
-                if account_name is None:
-                    account_name = gui_instance.handle_unrecognized_account(
-                        nbaccount, accdf
-                    )
-                    lastbalance = accdf.loc[accdf['date'].idxmax(), 'balance']
-                    initialbalance = lastbalance - df[catnames["amount"]].sum()
-                    initialop = pd.DataFrame(
-                        {
-                            "date": [df[catnames["date"]].min()],
-                            "name": "Initial balance for " + account_name,
-                            "account": account_name,
-                            "amount": round(initialbalance,2),
-                            "category": self.categories[0],
-                            "Mensuel": False,
-                        }
-                    )
-                    if self.operations.empty:
-                        self.operations = initialop
-                    else:
-                        self.operations = pd.concat(
-                            [self.operations, initialop], ignore_index=True
-                        )
-                    gui_instance.update_all()
-
-                # Update account balance
-                self.accounts[account_name]["account_balance"] = pd.concat(
-                    [self.accounts[account_name]["account_balance"], accdf],
-                    ignore_index=True,
-                )
+    def current_balances(self, end=None):
+        """
+        Returns the current balance of each account, computed from its operations,
+        or its balance before the date end when given.
+        """
+        balances = self.running_balances()
+        if end is not None:
+            # Les soldes courants sont triés par date
+            balances = balances.iloc[
+                : balances["date"].searchsorted(pd.Timestamp(end))
+            ]
+        balances = balances.groupby("account")["balance"].last()
+        return balances.reindex(list(self.accounts), fill_value=0.0)
 
-                # Build operations DataFrame
-                newdf = pd.DataFrame(
+    def balance_snapshots(self, account=None):
+        """
+        Returns the balances given by the bank (account, date, balance), sorted
+        by date, whatever the layout of each account_balance.
+        """
+        snapshots = []
+        for name, details in self.accounts.items():
+            if account is not None and name != account:
+                continue
+            balance = details["account_balance"]
+            if not {"date", "balance"} <= set(balance.columns):
+                balance = _records_to_balance(_balance_to_records(balance))
+            snapshots.append(
+                pd.DataFrame(
                     {
-                        "date": df[catnames["date"]],
-                        "name": df[catnames["name"]],
-                        "account": account_name,
-                        "amount": df[catnames["amount"]],
-                        "category": "NC",
-                        "Mensuel": False,
+                        "account": name,
+                        "date": pd.to_datetime(balance["date"], errors="coerce").astype(
+                            "datetime64[ns]"
+                        ),
+                        "balance": balance["balance"],
                     }
                 )
-                break
-
-        if newdf is None:
-            if mapping:
-                # Apply manual column mapping
-                newdf = pd.DataFrame(
+            )
+        snapshots = pd.concat(
+            [
+                pd.DataFrame(
                     {
-                        "date": df[mapping["date"]],
-                        "name": df[mapping["name"]],
-                        "amount": df[mapping["amount"]],
-                        "account": account_name,
-                        "Catégorie": "NC",
-                        "Mensuel": False,
+                        "account": pd.Series(dtype=object),
+                        "date": pd.Series(dtype="datetime64[ns]"),
+                        "balance": pd.Series(dtype=float),
                     }
                 )
-            else:
-                raise ValueError("Unrecognized file format. Mapping required.")
-        if newdf.empty:
-            raise ValueError("No data loaded.")
-        # Add the new operations to the main DataFrame
-        if self.operations.empty:
-            self.operations = newdf
-        else:
-            account_operations = self.operations[self.operations["account"] == account_name]
-            if not account_operations.empty:
-                last_date = account_operations["date"].max()
-
-                # Filtrer par date
-                pre_filter_count = len(newdf)
-                newdf = newdf[newdf["date"] >= last_date]
-                ignored_operations += pre_filter_count - len(newdf)
-
-                # Filtrer par libellé et montant pour les opérations du même jour
-                existing_same_day = account_operations[account_operations["date"] == last_date]
-                pre_filter_count = len(newdf)
-                newdf = newdf[~(
-                    (newdf["date"] == last_date) &
-                    (newdf["name"].isin(existing_same_day["name"])) &
-                    (newdf["amount"].isin(existing_same_day["amount"]))
-                )]
-                ignored_operations += pre_filter_count - len(newdf)
-            added_operations = len(newdf)
-            self.operations = pd.concat([self.operations, newdf], ignore_index=True)
-            messagebox.showinfo(
-                "Import Report",
-                f"Import complete:\n\n"
-                f"Operations added: {added_operations}\n"
-                f"Operations ignored: {ignored_operations}"
-            )
-        gui_instance.update_all()
+            ]
+            + snapshots,
+            ignore_index=True,
+        )
+        snapshots["balance"] = pd.to_numeric(snapshots["balance"], errors="coerce")
+        snapshots = snapshots.dropna(subset=["date", "balance"])
+        return snapshots.sort_values("date", kind="stable").reset_index(drop=True)
 
-    def save_to_file(self):
+    def reconcile(self, account=None, tolerance=0.01):
         """
-        Sauvegarde les données dans un fichier pickle.
+        Compares the bank balance snapshots with the running balance at the end
+        of their day (as-of join); with several snapshots on one day (statements
+        giving the balance after each operation), the last one is the end of day
+        balance. Returns one row per account and snapshot day: account, date,
+        balance (bank), computed, drift, and the flags drifting (|drift| above
+        tolerance) and new_drift (the drift changed since the previous snapshot
+        of the account: an operation is missing or wrong around that day).
         """
-        with open(self.save_file, "wb") as file:
-            pickle.dump(self, file)
+        snapshots = self.balance_snapshots(account)
+        snapshots["day"] = snapshots["date"].dt.normalize()
+        snapshots = snapshots.drop_duplicates(["account", "day"], keep="last")
+        balances = self.running_balances(account)
+        daily = (
+            balances.assign(day=balances["date"].dt.normalize())
+            .groupby(["account", "day"], sort=False)["balance"]
+            .last()
+            .reset_index()
+            .rename(columns={"balance": "computed"})
+            .sort_values("day", kind="stable")
+        )
+        report = pd.merge_asof(
+            snapshots.astype({"account": object}),
+            daily.astype({"account": object}),
+            on="day",
+            by="account",
+            direction="backward",
+        ).drop(columns="day")
+        report["computed"] = report["computed"].fillna(0.0)
+        report["drift"] = (report["balance"] - report["computed"]).round(2)
+        report["drifting"] = report["drift"].abs() > tolerance
+        previous = report.groupby("account", sort=False)["drift"].shift()
+        report["new_drift"] = report["drifting"] & (
+            (report["drift"] - previous.fillna(0.0)).abs() > tolerance
+        )
+        return report
 
-    @staticmethod
-    def load_from_file(file_path: str):
+
+class VirtualTable:
+    """
+    Treeview for large tables: the rows are kept as column arrays and only the
+    window scrolled into view (plus OVERSCAN rows) exists as Treeview items,
+    so a refresh costs the size of the viewport, not of the data.
+    Item iids are the row ids; the selection survives scrolling.
+    """
+
+    OVERSCAN = 10
+
+    def __init__(self, parent, columns, height=20):
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(
+            self.frame, columns=columns, show="headings", height=height
+        )
+        self.scrollbar = ttk.Scrollbar(
+            self.frame, orient=tk.VERTICAL, command=self.yview
+        )
+        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
+        for col in columns:
+            self.tree.heading(col, text=col)
+
+        self.columns = list(columns)
+        self.height = height
+        self.ids = []
+        self.data = []
+        self.first = 0
+        self.selected = set()
+        self._window = None
+        # Dernier clic : True avec Ctrl/Maj (la sélection est étendue)
+        self._extend = None
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        for sequence in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.tree.bind(sequence, self._on_key)
+        self.tree.bind("<Configure>", lambda e: self.render())
+        self.tree.bind("<ButtonPress-1>", self._on_click)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def set_rows(self, ids, columns):
         """
-        Charge les données depuis un fichier pickle.
+        Replaces the rows: ids (one per row) and one array per column. The scroll
+        position and the selected ids still present are kept.
         """
-        with open(file_path, "rb") as file:
-            return pickle.load(file)
+        self.ids = [str(op_id) for op_id in ids]
+        self.data = list(columns)
+        self.selected &= set(self.ids)
+        self._window = None
+        self.render()
 
-    def _detect_header_row(self, file_path):
+    def selection(self):
         """
-        Detects the row number where the header begins in an Excel or CSV file.
-        Returns the row number to skip irrelevant lines at the top.
-        Works for both Excel and CSV files.
+        Returns the iids of the selected rows, including the ones scrolled away.
         """
-        file_extension = file_path.split(".")[-1].lower()
-
-        if file_extension.startswith("xls"):  # Handle Excel files
-            # Use pandas to inspect the first few rows
-            df_preview = pd.read_excel(file_path, header=None, nrows=10)
-            for i, row in df_preview.iterrows():
-                if any(
-                    DICTBANK[bank]["date"] in str(cell)
-                    for bank in DICTBANK
-                    for cell in row
-                ):
-                    return i
-        elif file_extension == "csv":  # Handle CSV files
-            try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    for i, line in enumerate(file):
-                        if any(DICTBANK[bank]["date"] in line for bank in DICTBANK):
-                            return i
-            except UnicodeDecodeError:
-                pass
+        visible = self.tree.selection()
+        return visible + tuple(sorted(self.selected - set(visible)))
 
-        return 0  # Default to the first row if no header is found
+    def visible_rows(self):
+        """
+        Number of rows that fit in the Treeview (its height option until it is
+        mapped).
+        """
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return self.height
+        style = ttk.Style(self.tree)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        # Une ligne pour les en-têtes
+        return max(1, height // row_height - 1)
+
+    def render(self):
+        """
+        Materializes the rows of the window [first, first + visible + OVERSCAN).
+        """
+        count = self.visible_rows()
+        total = len(self.ids)
+        self.first = max(0, min(self.first, total - count))
+        stop = min(total, self.first + count + self.OVERSCAN)
+        if self._window == (self.first, stop):
+            return
+        self._window = (self.first, stop)
+
+        self.tree.delete(*self.tree.get_children())
+        for position in range(self.first, stop):
+            self.tree.insert(
+                "",
+                "end",
+                iid=self.ids[position],
+                values=[column[position] for column in self.data],
+            )
+        self.tree.yview_moveto(0)
+        shown = [iid for iid in self.ids[self.first:stop] if iid in self.selected]
+        if shown:
+            self.tree.selection_set(shown)
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + count) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
-    def add_virtual_operation(self, from_category, to_category, amount, date=None):
+    def yview(self, *args):
         """
-        Transfers money virtually from one category to another.
+        Scrollbar command: ("moveto", fraction) or ("scroll", number, "units"|"pages").
         """
-        if from_category not in self.categories or to_category not in self.categories:
-            raise ValueError("Invalid category provided.")
-        if from_category == "Revenus" and amount > self.get_category_balance(
-            from_category
-        ):
-            raise ValueError("Insufficient funds in 'Revenus' category.")
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.ids))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.render()
+
+    def see(self, position):
+        """
+        Scrolls so that the row at the given position is visible.
+        """
+        count = self.visible_rows()
+        if position < self.first:
+            self.first = position
+        elif position >= self.first + count:
+            self.first = position - count + 1
+        self.render()
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -3, "units")
+        else:
+            self.yview("scroll", 3, "units")
+        return "break"
+
+    def _on_key(self, event):
+        if not self.ids:
+            return "break"
+        focus = self.tree.focus()
+        current = self.ids.index(focus, self.first) if focus in self.ids else self.first
+        count = self.visible_rows()
+        moves = {
+            "Up": current - 1,
+            "Down": current + 1,
+            "Prior": current - count,
+            "Next": current + count,
+            "Home": 0,
+            "End": len(self.ids) - 1,
+        }
+        position = max(0, min(moves[event.keysym], len(self.ids) - 1))
+        self.see(position)
+        iid = self.ids[position]
+        self.selected = {iid}
+        self.tree.selection_set(iid)
+        self.tree.focus(iid)
+        return "break"
+
+    # Masques de event.state pour Maj et Ctrl
+    EXTEND_MODIFIERS = 0x0001 | 0x0004
+
+    def _on_click(self, event):
+        if not self.tree.identify_row(event.y):
+            return
+        self._extend = bool(event.state & self.EXTEND_MODIFIERS)
+        # Oublié si le clic n'a pas changé la sélection (aucun événement)
+        self.tree.after_idle(self._forget_click)
+
+    def _forget_click(self):
+        self._extend = None
+
+    def _on_select(self, event):
+        extend, self._extend = self._extend, None
+        if extend is False:
+            # Un clic simple remplace aussi la sélection hors de la fenêtre
+            self.selected = set(self.tree.selection())
+            return
+        window = set(self.ids[slice(*self._window)]) if self._window else set()
+        self.selected = (self.selected - window) | set(self.tree.selection())
 
-        date = date or pd.Timestamp.now()
 
-        # Create two operations: one debit and one credit
-        debit_op = {
-            "date": date,
-            "name": f"Transfer to {to_category}",
-            "account": "Virtual",
-            "amount": -amount,
-            "category": from_category,
-            "Mensuel": False,
-        }
-        credit_op = {
-            "date": date,
-            "name": f"Transfer from {from_category}",
-            "account": "Virtual",
-            "amount": amount,
-            "category": to_category,
-            "Mensuel": False,
-        }
+class BackgroundTask:
+    """
+    Runs func(task) in a worker thread while a progress dialog with a Cancel
+    button keeps the window responsive. The worker never touches Tk: progress
+    updates, calls that need the main thread (dialogs) and the outcome go
+    through a queue polled with root.after, and on_done(result, error) is
+    called on the main thread once the function returns.
+    """
+
+    POLL_MS = 50
 
-        self.operations = pd.concat(
-            [self.operations, pd.DataFrame([debit_op, credit_op])], ignore_index=True
+    def __init__(self, root, title, func, on_done, cancellable=True):
+        self.root = root
+        self.on_done = on_done
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+
+        self.dialog = tk.Toplevel(root)
+        self.dialog.title(title)
+        self.dialog.transient(root)
+        self.dialog.resizable(False, False)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.message = ttk.Label(self.dialog, text=title + "...")
+        self.message.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.bar = ttk.Progressbar(self.dialog, length=300, mode="indeterminate")
+        self.bar.pack(padx=10, pady=5)
+        self.bar.start()
+        self.cancel_button = ttk.Button(
+            self.dialog,
+            text="Cancel",
+            command=self.cancel,
+            state=tk.NORMAL if cancellable else tk.DISABLED,
         )
+        self.cancel_button.pack(pady=(5, 10))
+        self.dialog.grab_set()
 
-    def get_category_balance(self, category):
+        self.thread = threading.Thread(target=self._run, args=(func,), daemon=True)
+        self.thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+
+    def _run(self, func):
+        try:
+            self.queue.put(("done", func(self), None))
+        except Exception as e:
+            self.queue.put(("done", None, e))
+
+    # Appelées depuis le thread de travail
+
+    def progress(self, done, total=None, text=None):
         """
-        Calculates the total balance for a given category.
+        Reports progress (total None: unknown). Raises ValueError once the task
+        is cancelled, which rolls back the manager transaction in progress.
+        """
+        if self.cancelled.is_set():
+            raise ValueError("Cancelled by the user.")
+        self.queue.put(("progress", done, total, text))
+
+    def call(self, func, *args):
+        """
+        Runs func(*args) on the main thread and returns its result.
+        """
+        reply = {}
+        answered = threading.Event()
+        self.queue.put(("call", func, args, reply, answered))
+        answered.wait()
+        if "error" in reply:
+            raise reply["error"]
+        return reply["result"]
+
+    # Thread principal
+
+    def cancel(self):
+        if str(self.cancel_button["state"]) == tk.DISABLED:
+            return
+        self.cancelled.set()
+        self.message.config(text="Cancelling...")
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def _poll(self):
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progress":
+                self._show_progress(*message[1:])
+            elif message[0] == "call":
+                func, args, reply, answered = message[1:]
+                # Le dialogue appelé doit pouvoir recevoir les événements
+                self.dialog.grab_release()
+                try:
+                    reply["result"] = func(*args)
+                except Exception as e:
+                    reply["error"] = e
+                finally:
+                    answered.set()
+                    if self.dialog.winfo_exists():
+                        self.dialog.grab_set()
+            else:
+                self.dialog.destroy()
+                self.on_done(*message[1:])
+                return
+        self.root.after(self.POLL_MS, self._poll)
+
+    def _show_progress(self, done, total, text):
+        if self.cancelled.is_set():
+            return
+        if total:
+            if str(self.bar["mode"]) != "determinate":
+                self.bar.stop()
+                self.bar.config(mode="determinate")
+            self.bar.config(maximum=total, value=done)
+            text = text or f"{done} / {total}"
+        self.message.config(text=text or f"{done} rows")
+
+
+class ChartPanel:
+    """
+    Chart area of the main window (FigureCanvasTkAgg). The figure is created
+    on first use, which is when matplotlib gets imported, and then reused:
+    while the labels stay the same, showing a chart only resizes its bars.
+    The series are cached per (chart, period, account) for the current data
+    version, so switching periods does not recompute them.
+    """
+
+    CHARTS = {
+        "balances": "Account Balances (€)",
+        "categories": "Spending by Category (€)",
+    }
+    CACHE_SIZE = 64
+
+    def __init__(self, parent, manager):
+        self.manager = manager
+        self.frame = ttk.Frame(parent)
+        self.canvas = None
+        self.axes = None
+        self.bars = None
+        # Graphique affiché et ses libellés
+        self.chart = None
+        self.labels = None
+        self.cache = {}
+        self.version = None
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def _create_canvas(self):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(5, 4), dpi=100)
+        self.axes = figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(figure, master=self.frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def series(self, chart, start=None, end=None, account=None):
+        """
+        Returns the values of a chart (label -> value) for the period
+        [start, end) and the account (all accounts when None):
+        "balances" gives the balance of the accounts at the end of the period,
+        "categories" the spending per category over the period (virtual
+        transfers excluded).
+        """
+        if self.version != self.manager.version:
+            self.cache.clear()
+            self.version = self.manager.version
+        key = (chart, start, end, account)
+        if key in self.cache:
+            return self.cache[key]
+
+        if chart == "balances":
+            values = self.manager.current_balances(end)
+            if account is not None:
+                values = values[[account]]
+        else:
+            # Pour un compte donné, toutes ses opérations sont prises
+            virtual = False if account is None else None
+            sums = self.manager.category_sums(start, end, virtual, account)
+            sums = pd.to_numeric(sums.reindex(self.manager.categories, fill_value=0))
+            values = sums.clip(upper=0).abs().round(2)
+
+        if len(self.cache) >= self.CACHE_SIZE:
+            del self.cache[next(iter(self.cache))]
+        self.cache[key] = values
+        return values
+
+    def show(self, chart, start=None, end=None, account=None, title=""):
+        """
+        Draws a chart (see series), updating the bars in place when possible.
         """
-        return self.operations[self.operations["category"] == category]["amount"].sum()
+        values = self.series(chart, start, end, account)
+        labels = [str(label) for label in values.index]
+        if self.canvas is None:
+            self._create_canvas()
+
+        if (chart, labels) != (self.chart, self.labels):
+            self.axes.clear()
+            if chart == "balances":
+                self.bars = self.axes.bar(labels, values.values, color="skyblue")
+                self.axes.tick_params(axis="x", labelrotation=45)
+            else:
+                self.bars = self.axes.barh(labels, values.values, color="salmon")
+                self.axes.invert_yaxis()
+            self.chart, self.labels = chart, labels
+        else:
+            for bar, value in zip(self.bars, values.values):
+                if chart == "balances":
+                    bar.set_height(value)
+                else:
+                    bar.set_width(value)
+            self.axes.relim()
+            self.axes.autoscale_view()
+        self.axes.set_title(
+            f"{self.CHARTS[chart]} - {title}" if title else self.CHARTS[chart]
+        )
+        self.canvas.figure.tight_layout()
+        self.canvas.draw_idle()
 
 
 class BudgetGUI:
@@ -383,15 +3139,29 @@ class BudgetGUI:
     GUI for the budget management system. Allows users to manage accounts and operations via a graphical interface.
     """
 
-    def __init__(self, root: tk.Tk, manager: BudgetManager):
+    def __init__(self, root: tk.Tk, manager: BudgetManager, startup_times=None):
         """
         Initialize the GUI with the given root window and BudgetManager instance.
+        The current month is shown first; when the manager was loaded with
+        load_recent, the older years are loaded in the background. If a
+        startup_times dict is given, the first paint and history load times
+        are added to it and the startup report is printed on stderr.
         """
+        self._created = time.perf_counter()
         self.root = root
         self.manager = manager
+        self.startup_times = startup_times
         self.root.title("Budget Manager")
-        self.root.geometry("900x600")
+        self.root.geometry("1300x650")
+        # Vues à redessiner au prochain passage de refresh
+        self._dirty = set()
+        self._refresh_job = None
+        # Tâche de fond en cours (BackgroundTask)
+        self.task = None
         self.setup_ui()
+        self.select_current_month()
+        if self.manager.history_pending:
+            self.load_history()
 
     def setup_ui(self):
         """
@@ -434,7 +3204,9 @@ class BudgetGUI:
             frame, textvariable=self.month_var, state="readonly"
         )
         self.month_menu.grid(row=5, column=0, padx=5, pady=5)
-        self.month_menu.bind("<<ComboboxSelected>>", self.update_operations_table)
+        self.month_menu.bind(
+            "<<ComboboxSelected>>", lambda e: self.refresh("table", "summary", "chart")
+        )
 
         # Menu déroulant pour sélectionner un compte
         ttk.Label(frame, text="Account:").grid(row=6, column=0, padx=5, pady=5)
@@ -442,13 +3214,24 @@ class BudgetGUI:
         self.account_menu = ttk.Combobox(frame, textvariable=self.account_var, state="readonly")
         self.account_menu["values"] = ["All"] + list(self.manager.accounts.keys())  # "All" pour ne pas filtrer
         self.account_menu.grid(row=7, column=0, padx=5, pady=5)
-        self.account_menu.bind("<<ComboboxSelected>>", self.update_operations_table)
+        self.account_menu.bind(
+            "<<ComboboxSelected>>", lambda e: self.refresh("table", "chart")
+        )
 
         # Boutons de gestion des opérations
         ttk.Button(frame, text="Add Category", command=self.add_category).grid(
             row=8, column=0, sticky=tk.EW, padx=5, pady=2
         )
 
+        # Recherche dans les libellés
+        search_frame = ttk.Frame(frame)
+        search_frame.grid(row=9, column=0, sticky=tk.EW, padx=5, pady=2)
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.bind("<Return>", lambda e: self.refresh("table"))
+
         # Menu pour éditer des opérations réelles
         real_ops_frame = ttk.LabelFrame(frame, text="Operations")
         real_ops_frame.grid(row=6, column=1, sticky=tk.EW, padx=5, pady=5)
@@ -473,6 +3256,11 @@ class BudgetGUI:
             text="Categorize Operations",
             command=self.categorize_operations,
         ).grid(row=1, column=1, sticky=tk.EW, padx=5, pady=2)
+        ttk.Button(
+            real_ops_frame,
+            text="Import Folder",
+            command=self.handle_import_folder,
+        ).grid(row=1, column=2, sticky=tk.EW, padx=5, pady=2)
 
         # Menu des visualisations
         visualize_frame = ttk.LabelFrame(frame, text="Visualize")
@@ -494,17 +3282,15 @@ class BudgetGUI:
         )
 
         # Table des opérations
-        self.operations_table = ttk.Treeview(
+        # Seules les lignes visibles sont créées dans le Treeview
+        self.operations_table = VirtualTable(
             frame,
             columns=("date", "name", "account", "amount", "category", "Mensuel"),
-            show="headings",
             height=20,
         )
         self.operations_table.grid(
             row=0, column=1, rowspan=6, sticky=tk.NSEW, padx=5, pady=5
         )
-        for col in self.operations_table["columns"]:
-            self.operations_table.heading(col, text=col)
 
         # Menu pour ajouter des opérations virtuelles
         virtual_ops_frame = ttk.LabelFrame(frame, text="Add Virtual Operation")
@@ -572,50 +3358,203 @@ class BudgetGUI:
         for category in self.manager.categories:
             self.category_summary_table.heading(category, text=category)
 
+        # Graphiques (matplotlib n'est importé qu'au premier affichage)
+        self.chart_panel = ChartPanel(frame, self.manager)
+        self.chart_panel.grid(
+            row=0, column=2, rowspan=13, sticky=tk.NSEW, padx=5, pady=5
+        )
+
         # Configuration de la disposition
         frame.rowconfigure(0, weight=1)
         frame.columnconfigure(1, weight=1)
+        frame.columnconfigure(2, weight=1)
 
         # Initialisation des données
-        self.update_all()
+        self.refresh()
 
-    def update_all(self):
-        self.update_accounts_list()
-        self.update_year_menu()
-        self.update_month_menu()
-        self.update_accounts_list()
-        self.update_operations_table()
-        self.update_category_summary_table()
+    # Vues redessinées par refresh(), dans cet ordre
+    VIEWS = ("accounts", "periods", "categories", "table", "summary", "chart")
+    # Vues qui dépendent des opérations
+    DATA_VIEWS = ("accounts", "periods", "table", "summary", "chart")
+
+    def refresh(self, *views):
+        """
+        Marks views as dirty (all of them by default) and schedules a single
+        redraw at the next idle time: the calls made while handling an event
+        are coalesced and each dirty view is redrawn once.
+        """
+        self._dirty.update(views or self.VIEWS)
+        if self._refresh_job is None:
+            self._refresh_job = self.root.after_idle(self._refresh_dirty)
+
+    def _refresh_dirty(self):
+        """
+        Redraws the dirty views.
+        """
+        if self.task is not None:
+            # Les données sont en cours de modification par la tâche de fond
+            self._refresh_job = self.root.after(
+                BackgroundTask.POLL_MS, self._refresh_dirty
+            )
+            return
+        dirty, self._dirty = self._dirty, set()
+        self._refresh_job = None
+        if "accounts" in dirty:
+            self.update_accounts_list()
+        if "periods" in dirty:
+            self.update_year_menu()
+        if "table" in dirty:
+            self.update_operations_table()
+        if "categories" in dirty:
+            self.update_category_summary_table()
+        elif "summary" in dirty:
+            self.update_category_summary()
+        if "chart" in dirty:
+            self.update_chart()
+
+        if self.startup_times is not None and "first paint" not in self.startup_times:
+            self.root.update_idletasks()
+            self.startup_times["first paint"] = time.perf_counter() - self._created
+            self._report_startup()
+
+    def _report_startup(self):
+        """
+        Prints the startup report once the window and the history are loaded.
+        """
+        times = self.startup_times
+        if "first paint" in times and not self.manager.history_pending:
+            print(format_startup_report(times), file=sys.stderr)
+
+    def select_current_month(self):
+        """
+        Selects the current month in the period filters when it has operations.
+        """
+        today = pd.Timestamp.now()
+        if today.month in self.manager.cube().months_of(today.year):
+            self.year_var.set(str(today.year))
+            self.month_var.set(str(today.month))
+
+    def load_history(self):
+        """
+        Reads the older years in a worker thread while the latest one is shown,
+        then adds them (and replays the journal) on the main thread. Until then
+        the buttons are disabled, so the data cannot be changed or saved.
+        """
+        self._set_buttons_state(["disabled"])
+        self.root.title("Budget Manager (loading history...)")
+        start = time.perf_counter()
+        results = queue.Queue()
+
+        def read():
+            try:
+                results.put((self.manager.read_history(), None))
+            except Exception as e:
+                results.put((None, e))
+
+        def poll():
+            try:
+                parts, error = results.get_nowait()
+            except queue.Empty:
+                self.root.after(BackgroundTask.POLL_MS, poll)
+                return
+            if error is None:
+                try:
+                    self.manager.finish_loading(parts)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                # Les boutons restent désactivés : sauvegarder perdrait l'historique
+                self.root.title("Budget Manager (history not loaded)")
+                messagebox.showerror("Error", f"Could not load the history: {error}")
+                return
+            self.root.title("Budget Manager")
+            self._set_buttons_state(["!disabled"])
+            self.refresh()
+            if self.startup_times is not None:
+                self.startup_times["history"] = time.perf_counter() - start
+                self._report_startup()
+
+        threading.Thread(target=read, daemon=True).start()
+        self.root.after(BackgroundTask.POLL_MS, poll)
+
+    def _set_buttons_state(self, state, parent=None):
+        """
+        Applies a ttk state (e.g. ["disabled"]) to every button of the window.
+        """
+        for widget in (parent or self.root).winfo_children():
+            if isinstance(widget, ttk.Button):
+                widget.state(state)
+            self._set_buttons_state(state, widget)
+
+    def run_task(self, title, func, on_done, cancellable=True):
+        """
+        Runs func(task) in the background (see BackgroundTask). The views are
+        not redrawn and the buttons of the window are disabled while it runs;
+        then on_done(result, error) is called and the views are refreshed, on
+        the main thread.
+        """
+        if self.task is not None:
+            messagebox.showerror("Error", "Another task is already running.")
+            return
+
+        def finish(result, error):
+            task, self.task = self.task, None
+            self._set_buttons_state(["!disabled"])
+            try:
+                if error is not None and task.cancelled.is_set():
+                    messagebox.showinfo(title, "Cancelled.")
+                else:
+                    on_done(result, error)
+            finally:
+                self.refresh(*self.DATA_VIEWS)
+
+        # Désactivés avant la création du dialogue de progression
+        self._set_buttons_state(["disabled"])
+        self.task = BackgroundTask(self.root, title, func, finish, cancellable)
+
+    def _warm_up(self):
+        """
+        Computes the aggregates the views need (called from a background task,
+        so that the refresh after it stays quick).
+        """
+        self.manager.current_balances()
+        self.manager.cube()
+
+    def resolve_account_from(self, task):
+        """
+        Returns an account resolver for the imports of a background task: the
+        dialog of handle_unrecognized_account is shown on the main thread.
+        """
+        return lambda nbaccount, accdf: task.call(
+            self.handle_unrecognized_account, nbaccount, accdf
+        )
 
     def update_year_menu(self):
         """
         Updates the year dropdown with unique years from the operations.
         """
-        if self.manager.operations.empty:
-            self.year_menu["values"] = ["All"]
+        years = ["All"] + [str(year) for year in self.manager.cube().years()]
+        self.year_menu["values"] = years
+        # La sélection est gardée tant que l'année existe
+        if self.year_var.get() not in years:
             self.year_var.set("All")
-            return
-        years = self.manager.operations["date"].dt.year.dropna().unique()
-        years = sorted(years.astype(str).tolist())
-        self.year_menu["values"] = ["All"] + years
-        self.year_var.set("All")  # Default to all years
+        self.update_month_menu()
 
     def update_month_menu(self, event=None):
         """
-        Updates the month dropdown based on the selected year.
+        Updates the month dropdown based on the selected year. When the year was
+        just selected (event), the month is reset and the views are refreshed.
         """
-        if self.manager.operations.empty or self.year_var.get() == "All":
-            self.month_menu["values"] = ["All"]
+        months = ["All"]
+        if self.year_var.get() != "All":
+            months += [
+                str(month) for month in self.manager.cube().months_of(self.year_var.get())
+            ]
+        self.month_menu["values"] = months
+        if event is not None or self.month_var.get() not in months:
             self.month_var.set("All")
-            return
-        selected_year = self.year_var.get()
-        months = self.manager.operations[
-            self.manager.operations["date"].dt.year == int(selected_year)
-        ]["date"].dt.month
-        months = sorted(months.dropna().unique().astype(str).tolist())
-        self.month_menu["values"] = ["All"] + months
-        self.month_var.set("All")
-        self.update_operations_table()
+        if event is not None:
+            self.refresh("table", "summary", "chart")
 
     def update_category_summary_table(self):
         """
@@ -661,8 +3600,7 @@ class BudgetGUI:
                 return
             rule = rules_list.get(selected[0])
             keyword, _ = rule.split(" -> ")
-            del self.manager.categorization_rules[keyword]
-            self.manager.save_categorization_rules()
+            self.manager.delete_categorization_rule(keyword)
             update_rules_list()
             messagebox.showinfo("Success", f"Rule '{rule}' deleted successfully.")
 
@@ -701,6 +3639,47 @@ class BudgetGUI:
             row=3, column=1, padx=10, pady=10)
         ttk.Button(rules_window, text="Delete Rule", command=delete_rule).grid(
             row=3, column=2, padx=10, pady=10)
+        ttk.Button(rules_window, text="Rule Report", command=self.show_rule_report).grid(
+            row=4, column=0, columnspan=3, pady=10)
+
+    def show_rule_report(self):
+        """
+        Displays the rule statistics: hits, conflicts and match dates per rule,
+        never used rules first, and the cost of the categorization passes.
+        """
+
+        def export_report():
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".csv", filetypes=[("csv files", "*.csv")]
+            )
+            if file_path:
+                report.to_csv(file_path, sep=";", index=False)
+                messagebox.showinfo("Success", f"Report exported to {file_path}.")
+
+        stats = self.manager.rule_stats()
+        report = stats.report(self.manager.categorization_rules)
+
+        report_window = tk.Toplevel(self.root)
+        report_window.title("Rule Report")
+
+        columns = list(report.columns)
+        table = ttk.Treeview(report_window, columns=columns, show="headings", height=15)
+        for column in columns:
+            table.heading(column, text=column.capitalize())
+            table.column(column, width=90)
+        for values in report.fillna("").values.tolist():
+            table.insert("", "end", values=values)
+        table.grid(row=0, column=0, columnspan=2, padx=10, pady=10)
+
+        ttk.Label(report_window, text=stats.summary(), wraplength=600).grid(
+            row=1, column=0, columnspan=2, padx=10, pady=5
+        )
+        ttk.Button(report_window, text="Export", command=export_report).grid(
+            row=2, column=0, pady=10
+        )
+        ttk.Button(report_window, text="Close", command=report_window.destroy).grid(
+            row=2, column=1, pady=10
+        )
 
     def show_tooltip(self, widget, text):
         """
@@ -727,53 +3706,55 @@ class BudgetGUI:
 
     def update_accounts_list(self):
         """
-        Updates the list of accounts displayed in the listbox with their balances.
+        Updates the list of accounts displayed in the listbox with their balances,
+        computed from the operations. Accounts whose last bank balance does not
+        match are marked with "(!)".
         """
+        balances = self.manager.current_balances()
+        report = self.manager.reconcile()
+        drifting = set(
+            report.groupby("account").tail(1).query("drifting")["account"]
+        )
+        self.account_menu["values"] = ["All"] + list(self.manager.accounts.keys())
         self.accounts_listbox.delete(0, tk.END)
-        for account_name, details in self.manager.accounts.items():
-            balance = (
-                details["account_balance"].iloc[-1]
-                if not details["account_balance"].empty
-                else 0
-            )
+        for account_name, balance in balances.items():
+            mark = " (!)" if account_name in drifting else ""
             self.accounts_listbox.insert(
-                tk.END, f"{account_name} - {balance.iloc[-1]:.2f}€"
+                tk.END, f"{account_name} - {balance:.2f}€{mark}"
             )
 
-    def update_operations_table(self, event=None):
+    def selected_period(self):
         """
-        Updates the operations table based on the selected year and month.
+        Returns the [start, end) dates of the selected year and month.
         """
-        # Filtrage par année
-        filtered_operations = self.manager.operations
         selected_year = self.year_var.get()
-        if selected_year != "All":
-            filtered_operations = filtered_operations[
-                filtered_operations["date"].dt.year == int(selected_year)
-            ]
-
-            # Filtrage par mois
-            selected_month = self.month_var.get()
-            if selected_month != "All":
-                filtered_operations = filtered_operations[
-                    filtered_operations["date"].dt.month == int(selected_month)
-                ]
+        if selected_year == "All":
+            return period_bounds()
+        selected_month = self.month_var.get()
+        return period_bounds(
+            selected_year, None if selected_month == "All" else selected_month
+        )
 
-        # Filtrer par compte
+    def update_operations_table(self, event=None):
+        """
+        Updates the operations table based on the selected year and month.
+        """
+        # Filtrage par période et par compte
+        start, end = self.selected_period()
         selected_account = self.account_var.get()
-        if selected_account != "All":
-            filtered_operations = filtered_operations[
-                filtered_operations["account"] == selected_account
-            ]
-
-        # Actualiser la table des opérations
-        for row in self.operations_table.get_children():
-            self.operations_table.delete(row)
+        filtered_operations = self.manager.query(
+            account=None if selected_account == "All" else selected_account,
+            start=start,
+            end=end,
+            text=self.search_var.get().strip(),
+        )
 
-        for idx, operation in filtered_operations.iterrows():
-            self.operations_table.insert(
-                "", "end", values=operation.to_list()
-            )  # Utilise uniquement les colonnes
+        # Actualiser la table des opérations (l'iid de chaque ligne est l'id
+        # de l'opération) ; les lignes sont matérialisées au défilement
+        self.operations_table.set_rows(
+            filtered_operations["id"].to_numpy(),
+            [filtered_operations[col].array for col in self.operations_table.columns],
+        )
 
     def add_account(self):
         """
@@ -786,9 +3767,20 @@ class BudgetGUI:
             initial_balance = float(entry_balance.get()) if entry_balance.get() else 0.0
 
             try:
-                balance_df = pd.DataFrame({pd.Timestamp.now(): [initial_balance]})
+                now = pd.Timestamp.now()
+                balance_df = pd.DataFrame({"date": [now], "balance": [initial_balance]})
                 self.manager.add_account(account_name, account_num, balance_df)
-                self.update_accounts_list()
+                if initial_balance:
+                    # Comme à l'import, le solde initial est une opération
+                    self.manager.add_operation(
+                        now,
+                        "Initial balance for " + account_name,
+                        account_name,
+                        initial_balance,
+                        self.manager.categories[0],
+                        False,
+                    )
+                self.refresh(*self.DATA_VIEWS)
                 add_window.destroy()
             except ValueError as e:
                 messagebox.showerror("Error", str(e))
@@ -826,7 +3818,7 @@ class BudgetGUI:
         def save_category():
             new_category = entry_category.get()
             if new_category and new_category not in self.manager.categories:
-                self.manager.categories.append(new_category)
+                self.manager.add_category(new_category)
                 self.from_menu["menu"].add_command(
                     label=new_category,
                     command=lambda value=new_category: self.from_var.set(value),
@@ -835,7 +3827,7 @@ class BudgetGUI:
                     label=new_category,
                     command=lambda value=new_category: self.to_var.set(value),
                 )
-                self.update_all()
+                self.refresh("categories", "chart")
                 add_window.destroy()
             else:
                 messagebox.showerror("Error", "Category already exists or is invalid.")
@@ -868,18 +3860,12 @@ class BudgetGUI:
             monthly = bool(monthly_var.get())
 
             try:
-                # Add the operation
+                # Add the operation (the balance is computed from the operations)
                 self.manager.add_operation(
                     date, label, account, amount, category, monthly
                 )
 
-                # Update the account balance
-                self.manager.accounts[account]["account_balance"].loc[date] = (
-                    self.manager.accounts[account]["account_balance"].iloc[-1, 1]
-                    + amount
-                )
-
-                self.update_operations_table()
+                self.refresh(*self.DATA_VIEWS)
                 add_window.destroy()
             except ValueError as e:
                 messagebox.showerror("Error", str(e))
@@ -929,32 +3915,20 @@ class BudgetGUI:
         Deletes the selected operation from the table and the underlying data.
         """
         selected_item = self.operations_table.selection()
-        print(self.operations_table.item(selected_item))
         if not selected_item:
             messagebox.showerror("Error", "Please select an operation to delete.")
             return
 
-        # Get index of the selected operation in the DataFrame
-        index = self.operations_table.item(selected_item)["values"][
-            0
-        ]  # Assume first column is the DataFrame index
+        # L'iid de la ligne sélectionnée est l'id de l'opération
+        op_id = int(selected_item[0])
 
         # Confirm deletion
         confirm = messagebox.askyesno(
             "Confirm Deletion", "Are you sure you want to delete this operation?"
         )
         if confirm:
-            dfs = self.manager.operations
-            name = self.operations_table.item(selected_item)["values"][1]
-            account = self.operations_table.item(selected_item)["values"][2]
-            idx = dfs.index[
-                (dfs["date"] == pd.Timestamp(index))
-                & (dfs["name"] == name)
-                & (dfs["account"] == account)
-            ].tolist()
-            self.manager.operations.drop(idx[0], inplace=True)
-            self.manager.operations.reset_index(drop=True, inplace=True)
-            self.update_operations_table()
+            self.manager.delete_operation(op_id)
+            self.refresh(*self.DATA_VIEWS)
             messagebox.showinfo("Success", "Operation deleted successfully.")
 
     def edit_operation(self):
@@ -965,27 +3939,23 @@ class BudgetGUI:
         if not selected_item:
             messagebox.showerror("Error", "Please select an operation to edit.")
             return
-        # Get index of the selected operation in the DataFrame
-        values =  self.operations_table.item(selected_item)["values"]
-        index = self.manager.operations.index[(
-            self.manager.operations['date']==values[0]) & (
-                self.manager.operations['name']==values[1]) & (
-                    self.manager.operations['amount']==float(values[3]))][0]
-        
-        operation = self.manager.operations.loc[index]
+        # L'iid de la ligne sélectionnée est l'id de l'opération
+        op_id = int(selected_item[0])
+        operation = self.manager.get_operation(op_id)
 
         def save_changes():
             try:
                 # Update the DataFrame with new values
-                self.manager.operations.at[index, "date"] = pd.Timestamp(
-                    entry_date.get()
+                self.manager.edit_operation(
+                    op_id,
+                    date=pd.Timestamp(entry_date.get()),
+                    name=entry_name.get(),
+                    amount=float(entry_amount.get()),
+                    category=category_menu.get(),
+                    Mensuel=bool(monthly_var.get()),
                 )
-                self.manager.operations.at[index, "name"] = entry_name.get()
-                self.manager.operations.at[index, "amount"] = float(entry_amount.get())
-                self.manager.operations.at[index, "category"] = category_menu.get()
-                self.manager.operations.at[index, "Mensuel"] = bool(monthly_var.get())
 
-                self.update_operations_table()
+                self.refresh(*self.DATA_VIEWS)
                 edit_window.destroy()
                 messagebox.showinfo("Success", "Operation updated successfully.")
             except Exception as e:
@@ -1034,22 +4004,20 @@ class BudgetGUI:
 
         def save_and_next():
             # Save category for the current operation
-            current_index = non_categorized_indices[op_index[0]]
+            current_id = non_categorized_ids[op_index[0]]
             selected_category = category_var.get()
-            self.manager.operations.at[current_index, "category"] = selected_category
+            self.manager.edit_operation(current_id, category=selected_category)
             # Move to the next operation
             op_index[0] += 1
-            self.update_operations_table()
-            self.update_category_summary()
-            if op_index[0] < len(non_categorized_indices):
+            self.refresh("table", "summary", "chart")
+            if op_index[0] < len(non_categorized_ids):
                 show_operation(op_index[0])
             else:
                 messagebox.showinfo("Success", "All operations have been categorized.")
                 categorize_window.destroy()
 
         def show_operation(index):
-            current_index = non_categorized_indices[index]
-            operation = self.manager.operations.iloc[current_index]
+            operation = self.manager.get_operation(non_categorized_ids[index])
 
             # Display operation details
             label_operation.config(
@@ -1061,13 +4029,22 @@ class BudgetGUI:
                 text=f"{operation['name']} | {operation['amount']} €"
             )
 
-            # Set default category suggestion
-            default_category = "NC"
-            for keyword, category in self.manager.categorization_rules.items():
-                if keyword in operation["name"].upper():
-                    default_category = category
-                    break
+            # Set default category suggestion: rules first, then the classifier
+            default_category = self.manager.suggest_category(operation["name"])
+            prediction = predictions.loc[non_categorized_ids[index]]
+            if (
+                default_category == "NC"
+                and prediction["confidence"] >= CLASSIFIER_MIN_CONFIDENCE
+            ):
+                default_category = prediction["category"]
             category_var.set(default_category)
+            if pd.isna(prediction["category"]):
+                label_suggestion.config(text="")
+            else:
+                label_suggestion.config(
+                    text=f"Suggestion: {prediction['category']} "
+                    f"({prediction['confidence']:.0%})"
+                )
 
         def add_category_in_catop():
             """
@@ -1102,18 +4079,22 @@ class BudgetGUI:
                 label=new_category,
                 command=lambda value=new_category: category_var.set(value),
             )
-            self.update_all()
+            self.refresh("categories", "chart")
 
         # Filter non-categorized operations
-        non_categorized_indices = self.manager.operations[
+        non_categorized_ids = self.manager.operations.loc[
             (self.manager.operations["category"] == "NC")
-            | (self.manager.operations["category"].isnull())
-        ].index.tolist()
+            | (self.manager.operations["category"].isnull()),
+            "id",
+        ].tolist()
 
-        if not non_categorized_indices:
+        if not non_categorized_ids:
             messagebox.showinfo("Info", "No uncategorized operations found.")
             return
 
+        # Suggestions du classifieur pour toutes les opérations en une fois
+        predictions = self.manager.predict_categories(non_categorized_ids)
+
         op_index = [0]  # Track current operation index
 
         # Create window for categorization
@@ -1142,6 +4123,9 @@ class BudgetGUI:
         )
         category_menu.grid(row=2, column=1, padx=5, pady=5)
 
+        label_suggestion = ttk.Label(categorize_window, text="", font=("Arial", 8))
+        label_suggestion.grid(row=5, column=0, columnspan=2, padx=10, pady=5)
+
         ttk.Button(categorize_window, text="Next", command=save_and_next).grid(
             row=3, column=0, columnspan=2, pady=10
         )
@@ -1172,25 +4156,21 @@ class BudgetGUI:
         account_name = self.accounts_listbox.get(tk.ACTIVE)
         if not file_path or not account_name:
             return
-        try:
-            self.manager.import_operations_from_excel(file_path, self)
-            self.update_operations_table()
-        except ValueError as e:
-            messagebox.showerror("Error", str(e))
+        self.import_file(file_path)
 
     def view_operations(self):
         """
         Display all operations in the table.
         """
-        self.update_operations_table()
+        self.refresh("table")
 
     def view_account_balances(self):
         """
         Display balances for all accounts in a separate dialog.
         """
         balances = "\n".join(
-            f"{account}: {self.manager.accounts[account]['account_balance'].iloc[-1, 0]:.2f}€"
-            for account in self.manager.accounts.keys()
+            f"{account}: {balance:.2f}€"
+            for account, balance in self.manager.current_balances().items()
         )
         messagebox.showinfo("Account Balances", balances)
 
@@ -1198,49 +4178,53 @@ class BudgetGUI:
         """
         Save all data to a pickle file.
         """
-        self.manager.save_to_file()
-        messagebox.showinfo("Success", "Data saved successfully.")
+
+        def done(result, error):
+            if error is not None:
+                messagebox.showerror("Error", str(error))
+            else:
+                messagebox.showinfo("Success", "Data saved successfully.")
+
+        self.run_task(
+            "Saving", lambda task: self.manager.save_to_file(), done, cancellable=False
+        )
 
     def visualize_account_balances(self):
         """
-        Display a bar chart of account balances using matplotlib.
+        Shows the account balances at the end of the selected period in the
+        chart panel.
         """
-        account_names = []
-        balances = []
-
-        for account, details in self.manager.accounts.items():
-            account_names.append(account)
-            balances.append(details["account_balance"].iloc[-1, 0])  # Latest balance
-
-        plt.figure(figsize=(8, 6))
-        plt.bar(account_names, balances, color="skyblue")
-        plt.title("Account Balances")
-        plt.xlabel("Accounts")
-        plt.ylabel("Balance (€)")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+        self.update_chart("balances")
 
     def visualize_category_spending(self):
         """
-        Display a pie chart of spending per category using matplotlib.
+        Shows the spending per category over the selected period in the chart
+        panel.
         """
-        spending = self.manager.operations.groupby("category")["amount"].sum()
-        categories = spending.index
-        amounts = spending.values
+        self.update_chart("categories")
 
-        plt.figure(figsize=(8, 6))
-        plt.pie(
-            amounts,
-            labels=categories,
-            autopct="%1.1f%%",
-            startangle=140,
-            colors=plt.cm.Paired.colors,
+    def update_chart(self, chart=None):
+        """
+        Redraws the chart panel (chart: the chart to show, by default the one
+        shown) for the selected period and account.
+        """
+        chart = chart or self.chart_panel.chart
+        if chart is None:
+            return
+        start, end = self.selected_period()
+        selected_account = self.account_var.get()
+        title = " / ".join(
+            value
+            for value in (self.year_var.get(), self.month_var.get(), selected_account)
+            if value != "All"
+        )
+        self.chart_panel.show(
+            chart,
+            start,
+            end,
+            None if selected_account == "All" else selected_account,
+            title or "All",
         )
-        plt.title("Spending by Category")
-        plt.axis("equal")  # Ensure the pie chart is circular
-        plt.tight_layout()
-        plt.show()
 
     def handle_import_operations(self):
         """
@@ -1252,24 +4236,87 @@ class BudgetGUI:
 
         if not file_path:
             return
+        self.import_file(file_path)
 
-        try:
-            self.manager.import_operations_from_excel(file_path, self)
-            messagebox.showinfo("Success", "Operations imported successfully.")
-        except ValueError as e:
+    def import_file(self, file_path, force=False, mapping=None):
+        """
+        Imports a statement in the background, then shows the report.
+        """
+
+        def run(task):
+            result = self.manager.import_operations_from_excel(
+                file_path,
+                self.resolve_account_from(task),
+                mapping=mapping,
+                force=force,
+                progress=task.progress,
+            )
+            self._warm_up()
+            return result
+
+        def done(result, error):
+            if error is None:
+                if not result.skipped:
+                    self.show_import_report([result])
+                elif messagebox.askyesno(
+                    "Already Imported",
+                    f"This file was already imported into '{result.account}'.\n"
+                    "Import it again anyway?",
+                ):
+                    self.import_file(file_path, force=True, mapping=mapping)
             # If a mapping error occurs, open the manual mapping interface
-            if "Mapping required" in str(e):
-                mapping = self.manual_column_mapping(pd.read_excel(file_path))
-                if mapping:
-                    self.manager.import_operations_from_excel(
-                        file_path, self, mapping=mapping
-                    )
-                    messagebox.showinfo(
-                        "Success",
-                        "Operations imported successfully with custom mapping.",
-                    )
+            elif isinstance(error, ValueError) and "Mapping required" in str(error):
+                mapping_result = self.manual_column_mapping(pd.read_excel(file_path))
+                if mapping_result:
+                    self.import_file(file_path, force=force, mapping=mapping_result)
             else:
-                messagebox.showerror("Error", str(e))
+                messagebox.showerror("Error", str(error))
+
+        self.run_task("Importing " + os.path.basename(file_path), run, done)
+
+    def show_import_report(self, results):
+        """
+        Display the report of one or several imports.
+        """
+        lines = []
+        for result in results:
+            name = os.path.basename(result.file)
+            if result.error:
+                lines.append(f"{name}: {result.error}")
+            elif result.skipped:
+                lines.append(f"{name}: already imported, skipped")
+            else:
+                lines.append(
+                    f"{name}:\n"
+                    f"Operations added: {result.added}\n"
+                    f"Categorized by rules: {result.categorized}\n"
+                    f"Operations ignored: {result.ignored}"
+                )
+        messagebox.showinfo("Import Report", "\n\n".join(lines))
+
+    def handle_import_folder(self):
+        """
+        Import every bank statement of a folder at once.
+        """
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+
+
+        def run(task):
+            results = self.manager.import_folder(
+                folder, self.resolve_account_from(task), progress=task.progress
+            )
+            self._warm_up()
+            return results
+
+        def done(results, error):
+            if error is not None:
+                messagebox.showerror("Error", str(error))
+            else:
+                self.show_import_report(results)
+
+        self.run_task("Importing " + os.path.basename(folder), run, done)
 
     def manual_column_mapping(self, df):
         """
@@ -1386,10 +4433,7 @@ class BudgetGUI:
             def save_new_account():
                 new_account_name = entry_name.get()
                 if new_account_name:
-                    self.manager.accounts[new_account_name] = {
-                        "account_num": nbaccount,
-                        "account_balance": accdf,
-                    }
+                    # Le compte est créé par BudgetManager lors de l'import
                     result["choice"] = "create"
                     result["account_name"] = new_account_name
                     dialog.destroy()
@@ -1438,8 +4482,11 @@ class BudgetGUI:
         btn_cancel = ttk.Button(dialog, text="Cancel Import", command=cancel_import)
         btn_cancel.grid(row=rowcancel, column=0, columnspan=2, pady=10)
 
-        # Store the result and wait for user interaction
+        # Store the result and wait for user interaction; the dialog is modal, so
+        # the data cannot be changed while an import waits for the answer
         result = {"choice": None, "account_name": None}
+        dialog.transient(self.root)
+        dialog.grab_set()
         self.root.wait_window(dialog)
 
         # Handle the result
@@ -1467,32 +4514,11 @@ class BudgetGUI:
         """
         Updates the category summary table with real, virtual, and total balances.
         """
-        # Filtrer les opérations en fonction de l'année et du mois sélectionnés
-        selected_year = self.year_var.get()
-        selected_month = self.month_var.get()
-
-        filtered_operations = self.manager.operations
-        if selected_year != "All":
-            filtered_operations = filtered_operations[
-                filtered_operations["date"].dt.year == int(selected_year)
-            ]
-            if selected_month != "All":
-                filtered_operations = filtered_operations[
-                    filtered_operations["date"].dt.month == int(selected_month)
-                ]
-
-        # Calculer les soldes par catégorie
-        real_balances = (
-            filtered_operations[filtered_operations["account"] != "Virtual"]
-            .groupby("category")["amount"]
-            .sum()
-        )
-        virtual_balances = (
-            filtered_operations[filtered_operations["account"] == "Virtual"]
-            .groupby("category")["amount"]
-            .sum()
-        )
-        total_balances = self.manager.operations.groupby("category")["amount"].sum()
+        # Calculer les soldes par catégorie sur l'année et le mois sélectionnés
+        start, end = self.selected_period()
+        real_balances = self.manager.category_sums(start, end, virtual=False)
+        virtual_balances = self.manager.category_sums(start, end, virtual=True)
+        total_balances = self.manager.category_sums()
 
         # Insérer les lignes dans le tableau
         self.category_summary_table.delete(
@@ -1552,16 +4578,126 @@ class BudgetGUI:
         self.amount_var.set("")
 
         # Mettre à jour les affichages
-        self.update_all()
+        self.refresh(*self.DATA_VIEWS)
         messagebox.showinfo("Success", "Virtual operation added successfully.")
 
 
-if __name__ == "__main__":
-    try:
-        manager = BudgetManager.load_from_file("budget_data.pkl")
-    except FileNotFoundError:
-        manager = BudgetManager()
+def load_manager(data_path="budget_data", recent=False):
+    """
+    Loads the budget data: columnar store if present, otherwise the legacy
+    pickle file (migrated to the columnar store when pyarrow is installed).
+    With recent, a columnar store is only loaded up to its latest year (see
+    BudgetManager.load_recent); a pickle file is always loaded at once.
+    """
+    pickle_path = data_path + ".pkl"
+    if ColumnarStore.is_store(data_path):
+        if recent:
+            return BudgetManager.load_recent(data_path)
+        return BudgetManager.load_from_file(data_path)
+    if os.path.exists(pickle_path):
+        if ColumnarStore.is_available():
+            return BudgetManager.migrate_to_columnar(pickle_path, data_path)
+        return BudgetManager.load_from_file(pickle_path)
+    if ColumnarStore.is_available():
+        return BudgetManager(save_file=data_path)
+    return BudgetManager(save_file=pickle_path)
+
+
+def main(argv=None):
+    """
+    Entry point: without arguments the GUI is started (--timings prints the
+    startup timings on stderr).
+
+        python -m budget [--data budget_data] [--timings] import FILE_OR_FOLDER...
+            [--create-accounts | --account NAME] [--workers N] [--force]
+            [--no-rules]
+
+    imports statements without display and saves the data.
+    """
+    parser = argparse.ArgumentParser(prog="budget")
+    parser.add_argument("--data", default="budget_data", help="budget data path")
+    parser.add_argument(
+        "--timings", action="store_true", help="print the startup timings on stderr"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    import_parser = subparsers.add_parser("import", help="import bank statements")
+    import_parser.add_argument(
+        "sources", nargs="+", help="statement files, folders or glob patterns"
+    )
+    accounts = import_parser.add_mutually_exclusive_group()
+    accounts.add_argument(
+        "--create-accounts",
+        action="store_true",
+        help="create unknown accounts, named after their account number",
+    )
+    accounts.add_argument(
+        "--account", help="associate unknown account numbers with this account"
+    )
+    import_parser.add_argument(
+        "--workers", type=int, default=None, help="number of parsing processes"
+    )
+    import_parser.add_argument(
+        "--force", action="store_true", help="re-import files already imported"
+    )
+    import_parser.add_argument(
+        "--no-rules",
+        action="store_true",
+        help="leave imported operations uncategorized (NC)",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    # L'interface affiche d'abord la dernière année, le reste est chargé ensuite
+    manager = load_manager(args.data, recent=args.command != "import")
+    times = {"import": _IMPORT_TIME, "load": time.perf_counter() - start}
+
+    if args.command != "import":
+        root = tk.Tk()
+        BudgetGUI(root, manager, times if args.timings else None)
+        root.mainloop()
+        return 0
+    if args.timings:
+        print(format_startup_report(times), file=sys.stderr)
+
+    def resolve_account(account_num, balance):
+        if args.create_accounts:
+            return str(account_num)
+        if args.account:
+            return args.account
+        raise ValueError(f"Unknown account number {account_num}.")
+
+    results = []
+    for source in args.sources:
+        try:
+            if os.path.isfile(source):
+                results.append(
+                    manager.import_operations_from_excel(
+                        source,
+                        resolve_account,
+                        force=args.force,
+                        auto_categorize=not args.no_rules,
+                    )
+                )
+            else:
+                results.extend(
+                    manager.import_folder(
+                        source,
+                        resolve_account,
+                        args.workers,
+                        force=args.force,
+                        auto_categorize=not args.no_rules,
+                    )
+                )
+        except Exception as e:
+            results.append(ImportResult(file=source, error=_error_message(e)))
+    print(format_import_report(results))
+    manager.save_to_file()
+    return 1 if any(result.error for result in results) else 0
 
-    root = tk.Tk()
-    gui = BudgetGUI(root, manager)
-    root.mainloop()
+
+# Durée du chargement du module (rapport de démarrage)
+_IMPORT_TIME = time.perf_counter() - _MODULE_START
+
+
+if __name__ == "__main__":
+    sys.exit(main())